@@ -0,0 +1,152 @@
+from heapq import *
+import itertools
+import time
+
+import compactBoard as cb
+import deadlockDetector
+import greadyBfsSolver
+import solver
+import telemetry
+from transpositionTable import TranspositionTable
+
+# Weights of the heuristic in the passes after the greedy one. The heuristic
+# overestimates, so even the last pass may miss the shortest solution.
+WEIGHTS = (3, 2, 1.5, 1)
+TIME_BUDGET = 30  # Seconds spent improving the greedy solution
+GREEDY_STATES = 10**5 * 3  # Expansions of the greedy pass, as bfs_single_core
+PASS_STATES = 2 * 10**4  # Expansions of each weighted pass, a few seconds
+
+
+def cards_left(state: cb.CompactBoard) -> int:
+    """Cards still in the columns, each at least one move from the foundations"""
+    return sum(state.column_lengths())
+
+
+class AnytimeSearch:
+    """Anytime weighted A*.
+
+    A greedy search finds a first solution quickly, then passes of weighted
+    A* (f = g + weight * h, weights going down) look for shorter ones. A
+    pass drops every board that can not lead to a solution shorter than the
+    best so far, g plus the cards left being a lower bound on its length.
+    Lengths count single moves, so a run (see solver.MoveType.run) counts
+    its cards.
+
+    Each better solution goes to on_solution(node) as soon as it is found.
+    """
+
+    def __init__(self, root: cb.CompactBoard, on_solution=None, budget=TIME_BUDGET):
+        self.root = root
+        self.on_solution = on_solution
+        self.budget = budget
+        self.deadline = None  # Set once the greedy solution is found
+        self.best = None
+        self.best_length = None
+        self.states_processed = 0
+
+    def should_stop(self) -> bool:
+        if self.deadline is not None and time.time() > self.deadline:
+            return True
+        return solver.AsyncSolver._stop
+
+    def improve(self, node: solver.TreeNode, length: int):
+        if self.best_length is not None and length >= self.best_length:
+            return
+        self.best, self.best_length = node, length
+        print(f"Anytime solver found a {length} move solution")
+        if self.on_solution is not None:
+            self.on_solution(node)
+
+    def weighted_pass(self, weight: float) -> bool:
+        """Search for a shorter solution with f = g + weight * h.
+
+        Returns True if the pass ran out of boards, so that no shorter
+        solution is left to find.
+        """
+        move_card = {
+            solver.MoveType.foundation: solver.move_col_foundation,
+            solver.MoveType.column: solver.move_col_col,
+            solver.MoveType.run: solver.move_run,
+        }
+        table = TranspositionTable(greadyBfsSolver.TT_MEMORY_MB)
+        table.visit(self.root.key, 0)
+        tie = itertools.count()
+        open_list = [(0, next(tie), 0, solver.TreeNode(self.root, score=0))]
+        stats = telemetry.stats
+        telemetry.track(open_list, table)
+
+        expanded = 0
+        while open_list:
+            if expanded >= PASS_STATES or self.should_stop():
+                return False
+            _, _, g, node = heappop(open_list)
+            state = node.state
+            best = table.get(state.key)
+            if best is not None and best < g:
+                continue  # Reopened with a shorter path since
+            if g + cards_left(state) >= self.best_length:
+                continue  # The best solution was found since it was queued
+            if state.is_game_won():
+                self.improve(node, g)
+                continue
+
+            expanded += 1
+            self.states_processed += 1
+            stats.expanded += 1
+            stats.depth = node.actualCost
+            for move in solver.get_possible_moves(state, node.move):
+                child = move_card[move[0]](state, move[1], move[2])
+                if child is None:
+                    continue
+                stats.generated += 1
+                cost = g + (len(move[1]) if move[0] == solver.MoveType.run else 1)
+                if cost + cards_left(child) >= self.best_length:
+                    continue
+                if not table.visit(child.key, cost, reopen=True):
+                    stats.duplicates += 1
+                    continue
+                if deadlockDetector.is_dead(child, move):
+                    stats.dead += 1
+                    continue
+
+                h = solver.heuristic(child)
+                if stats.best_h is None or h < stats.best_h:
+                    stats.best_h = h
+                f = cost + weight * h
+                child_node = solver.TreeNode(child, node, f)
+                node.add_child(child_node, move)
+                heappush(open_list, (f, next(tie), cost, child_node))
+            stats.open_size = len(open_list)
+        return True
+
+    def run(self) -> solver.TreeNode | None:
+        solution, self.states_processed = greadyBfsSolver.bfs_core(
+            solver.TreeNode(self.root),
+            max_states=GREEDY_STATES,
+            stop_check_fn=self.should_stop,
+            process_id="anytime",
+        )
+        if solution is None:
+            return None
+        self.improve(solution, len(solver.solution_moves(solution)))
+        self.deadline = time.time() + self.budget
+
+        # A weight is kept for another pass, with the tighter bound, as long
+        # as its passes find shorter solutions
+        weights = iter(WEIGHTS)
+        weight = next(weights)
+        while weight is not None and not self.should_stop():
+            print(f"Anytime solver looking for less than {self.best_length} moves")
+            best_length = self.best_length
+            if self.weighted_pass(weight):
+                break  # None shorter
+            if self.best_length == best_length:
+                weight = next(weights, None)
+        return self.best
+
+
+def run_anytime(root: cb.CompactBoard, on_solution=None):
+    """Returns the best solution found, if any, and the states processed"""
+    search = AnytimeSearch(root, on_solution)
+    solution = search.run()
+    return solution, search.states_processed
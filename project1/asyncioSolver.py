@@ -0,0 +1,224 @@
+import asyncio
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import compactBoard as cb
+import solver
+import telemetry
+
+PROGRESS_INTERVAL = 0.5  # Seconds between progress updates of a running solve
+FINAL_STATUSES = ("solved", "unsolved", "time limit", "cancelled", "failed")
+
+_updates = None  # Progress queue of an executor worker, set by _init_worker
+
+
+def _init_worker(updates):
+    global _updates
+    _updates = updates
+
+
+def _watch(request_id, cancel_event, finished: threading.Event, start: float, samples):
+    """Stop the search once cancelled and report progress until it ends.
+
+    Updates carry the telemetry of the search (see telemetry.merge), from
+    the samples its processes put in the samples queue.
+    """
+    latest = dict()  # pid -> last sample
+    last_update = start
+    while not finished.wait(0.01):
+        while True:  # Drained even once cancelled, so no worker blocks on it
+            try:
+                sample = samples.get_nowait()
+            except queue.Empty:
+                break
+            latest[sample["pid"]] = sample
+        if cancel_event.is_set():
+            solver.AsyncSolver._stop = True
+            continue
+
+        now = time.time()
+        if now - last_update >= PROGRESS_INTERVAL:
+            update = {"status": "running", "elapsed": now - start}
+            if latest:
+                update.update(telemetry.merge(list(latest.values())))
+            _updates.put((request_id, update))
+            last_update = now
+
+
+def _solve_task(request_id, root_state, solver_type, batch_eval, cancel_event):
+    """Run one solve in an executor worker.
+
+    Returns the packed solution (or None), the number of states processed
+    and the time taken in seconds.
+    """
+    solver.AsyncSolver._stop = False
+    start = time.time()
+    _updates.put((request_id, {"status": "running", "elapsed": 0.0}))
+
+    samples = multiprocessing.Queue()  # Telemetry of the search processes
+    telemetry.start(samples, request_id, PROGRESS_INTERVAL)
+    finished = threading.Event()
+    threading.Thread(
+        target=_watch,
+        args=(request_id, cancel_event, finished, start, samples),
+        daemon=True,
+    ).start()
+    try:
+        solution, states_processed = solver.run_search(
+            root_state, solver_type, batch_eval
+        )
+    finally:
+        telemetry.stop()
+        finished.set()
+
+    packed = solver.pack_solution(solution) if solution is not None else None
+    return packed, states_processed, time.time() - start
+
+
+class SolveRequest:
+    """A solve submitted to a SolveService.
+
+    Await it for the solution, like AsyncSolver.get_solution, or iterate
+    over it with async for to get its progress updates. Each update is a
+    dict with a status; the last one has one of FINAL_STATUSES. Running
+    updates also have the search counters of telemetry.merge.
+    """
+
+    def __init__(self, request_id: int):
+        self.id = request_id
+        self.loop = asyncio.get_running_loop()
+        self.updates = asyncio.Queue()
+        self.task = None
+        self.finished = False
+
+    def publish(self, update: dict):
+        self.updates.put_nowait(update)
+
+    def cancel(self):
+        self.task.cancel()
+
+    def __await__(self):
+        return self.task.__await__()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        if self.finished:
+            raise StopAsyncIteration
+        update = await self.updates.get()
+        self.finished = update["status"] in FINAL_STATUSES
+        return update
+
+
+class SolveService:
+    """Runs solves for an asyncio program on a pool of solver processes.
+
+    Any number of solves can be submitted at once, they queue for the
+    workers of the process pool. Cancelling a solve, or reaching its
+    timeout, stops the search in its worker, along with the processes the
+    multi-core solvers start.
+    """
+
+    def __init__(self, max_workers=None):
+        if max_workers is None:
+            max_workers = max(1, multiprocessing.cpu_count() - 1)
+        self.manager = multiprocessing.Manager()  # Hands out cancel events
+        self.progress = multiprocessing.Queue()
+        self.executor = ProcessPoolExecutor(
+            max_workers, initializer=_init_worker, initargs=(self.progress,)
+        )
+        self.requests = dict()  # id -> SolveRequest of the running solves
+        self.ids = itertools.count()
+        threading.Thread(target=self._dispatch_progress, daemon=True).start()
+
+    def _dispatch_progress(self):
+        """Forward progress from the workers to the event loop of each request"""
+        while True:
+            message = self.progress.get()
+            if message is None:
+                return
+            request = self.requests.get(message[0])
+            if request is not None:
+                request.loop.call_soon_threadsafe(request.publish, message[1])
+
+    def submit(
+        self, game_board, solver_type="gready-multi-core", timeout=60, batch_eval=False
+    ) -> SolveRequest:
+        """Start solving a board, must be called from a running event loop"""
+        request = SolveRequest(next(self.ids))
+        root_state = cb.CompactBoard.from_board(game_board.model)
+        request.task = asyncio.ensure_future(
+            self._run(request, root_state, solver_type.lower(), timeout, batch_eval)
+        )
+        return request
+
+    async def solve(
+        self, game_board, solver_type="gready-multi-core", timeout=60, batch_eval=False
+    ) -> solver.TreeNode | None:
+        """Solve a board, returning the root of the solution or None"""
+        return await self.submit(game_board, solver_type, timeout, batch_eval)
+
+    async def _run(self, request, root_state, solver_type, timeout, batch_eval):
+        self.requests[request.id] = request
+        cancel_event = self.manager.Event()
+        future = self.executor.submit(
+            _solve_task, request.id, root_state, solver_type, batch_eval, cancel_event
+        )
+        start = time.time()
+        try:
+            packed, states_processed, elapsed = await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(future)), timeout
+            )
+        except asyncio.TimeoutError:
+            future.cancel()
+            cancel_event.set()
+            request.publish({"status": "time limit", "elapsed": time.time() - start})
+            return None
+        except asyncio.CancelledError:
+            # A solve still waiting for a worker is dropped, a running one is
+            # stopped by its worker at the next stop check
+            if not future.cancel():
+                cancel_event.set()
+            request.publish({"status": "cancelled", "elapsed": time.time() - start})
+            raise
+        except Exception as e:
+            print(f"Solve request {request.id} failed: {e}")
+            request.publish({"status": "failed", "elapsed": time.time() - start})
+            return None
+        finally:
+            del self.requests[request.id]
+
+        root = None
+        if packed is not None:
+            root = solver.link_solution(solver.unpack_solution(packed))
+        request.publish(
+            {
+                "status": "solved" if root is not None else "unsolved",
+                "elapsed": elapsed,
+                "states_processed": states_processed,
+            }
+        )
+        return root
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.progress.put(None)
+        self.manager.shutdown()
+
+
+_default_service = None
+
+
+async def solve(
+    game_board, solver_type="gready-multi-core", timeout=60, batch_eval=False
+) -> solver.TreeNode | None:
+    """Solve a board on a SolveService shared by the whole program"""
+    global _default_service
+    if _default_service is None:
+        _default_service = SolveService()
+    return await _default_service.solve(game_board, solver_type, timeout, batch_eval)
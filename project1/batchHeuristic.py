@@ -0,0 +1,56 @@
+import random
+import numpy as np
+
+import compactBoard as cb
+import solver
+
+# Below this many boards the NumPy call overhead costs more than scoring each
+# board on its own
+MIN_BATCH = 4
+
+
+def evaluate(states: list[cb.CompactBoard]) -> list[float]:
+    """Score several boards at once, same result as solver.heuristic on each.
+
+    All boards must come from the same deal. The column cards of every board
+    are laid end to end in one array, so each step of the heuristic is a
+    single NumPy operation for the whole batch.
+    """
+    if len(states) < MIN_BATCH:
+        return [solver.heuristic(state) for state in states]
+
+    n = len(states)
+    n_cols = states[0].data[0]
+    start = cb.HEADER + n_cols
+    per_suit = 4 if states[0].mode == "small" else 13
+
+    lengths = np.frombuffer(
+        b"".join([state.data[cb.HEADER : start] for state in states]), dtype=np.uint8
+    )
+    cards = np.frombuffer(
+        b"".join([state.data[start:] for state in states]), dtype=np.uint8
+    ).astype(np.int32)
+    in_columns = [len(state.data) - start for state in states]
+    board = np.arange(n).repeat(in_columns)
+
+    # A suit's foundation holds every card of that suit not left in a column,
+    # so the value it needs next follows from the column cards alone
+    slots = board * 4 + cards % 4
+    next_values = per_suit + 1 - np.bincount(slots, minlength=n * 4)
+
+    # Cards above each card: the end of its column minus its own position
+    above = np.cumsum(lengths).repeat(lengths) - np.arange(cards.size) - 1
+
+    diff = cards // 4 + 1 - next_values[slots]
+    blocked = np.where(diff < above, above - diff, 0)
+    scores = np.bincount(board, weights=blocked, minlength=n).tolist()
+
+    results = []
+    for state, score, count in zip(states, scores, in_columns):
+        cost = solver.AsyncSolver.learn.get(state.key)
+        if cost != None:
+            results.append(-(10**3) // (cost + 1))
+        else:
+            found_len = per_suit * 4 - count
+            results.append(score + 13 * 4 - found_len + random.random())
+    return results
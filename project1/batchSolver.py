@@ -0,0 +1,177 @@
+import multiprocessing
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import board as b
+import compactBoard as cb
+import solvability
+import solver
+
+TIME_LIMIT = 60  # Seconds per deal
+
+
+def deal_state(seed: bytes, board_mode="big") -> cb.CompactBoard:
+    """Starting board of the deal given by a seed"""
+    return cb.CompactBoard.from_board(b.deal_board(seed, board_mode))
+
+
+def stop_search():
+    solver.AsyncSolver._stop = True
+
+
+def solve_deal(
+    seed: bytes, board_mode, solver_type, time_limit, batch_eval, precheck=False
+) -> dict:
+    """Solve one deal in the current process, giving up after time_limit.
+
+    The result holds the solution as a list of moves from the starting board
+    (see solver.replay_moves), empty if none was found. With precheck, the
+    solver only runs on deals solvability.check could not settle, and those
+    it proves unsolvable get the "unsolvable" status.
+    """
+    solver.AsyncSolver._stop = False
+    random.seed(seed)  # Same tie breaks for a deal on every run
+    state = deal_state(seed, board_mode)
+
+    timer = threading.Timer(time_limit, stop_search)
+    timer.start()
+    start = time.perf_counter()
+    try:
+        verdict, solution = solvability.UNKNOWN, None
+        states_processed = 0
+        if precheck:
+            verdict, solution = solvability.check(state)
+        if verdict == solvability.UNKNOWN:
+            solution, states_processed = solver.run_search(
+                state, solver_type, batch_eval
+            )
+    finally:
+        timer.cancel()
+    time_s = time.perf_counter() - start
+
+    if solution is not None:
+        status = "solved"
+    elif verdict == solvability.UNSOLVABLE:
+        status = "unsolvable"
+    elif solver.AsyncSolver._stop:
+        status = "time limit"
+    else:
+        status = "unsolved"
+    moves = solver.solution_moves(solution) if solution is not None else []
+    return {
+        "seed": seed.hex(),
+        "board_mode": board_mode,
+        "solver_type": solver_type,
+        "status": status,
+        "time_s": time_s,
+        "states_processed": states_processed,
+        "moves": moves,
+    }
+
+
+def _solve_deal_task(task: tuple) -> dict:
+    try:
+        return solve_deal(*task)
+    except Exception as e:
+        print(f"Deal {task[0].hex()} failed: {e}")
+        return {
+            "seed": task[0].hex(),
+            "board_mode": task[1],
+            "solver_type": task[2],
+            "status": "failed",
+            "time_s": 0,
+            "states_processed": 0,
+            "moves": [],
+        }
+
+
+def solve_batch(
+    seeds: list[bytes],
+    board_modes=("big",),
+    solver_type="gready-single-core",
+    time_limit=TIME_LIMIT,
+    num_workers=None,
+    batch_eval=False,
+    on_result=None,
+    precheck=False,
+) -> list[dict]:
+    """Solve every deal of seeds x board_modes on a pool of processes.
+
+    No board views are built in this process, and each worker takes deals
+    in chunks, so easy deals do not pay for a process or a message each.
+    Returns a result of solve_deal per deal, in order, calling on_result
+    with each as it comes in.
+    """
+    solver_type = solver_type.lower()
+    tasks = [
+        (seed, board_mode, solver_type, time_limit, batch_eval, precheck)
+        for seed in seeds
+        for board_mode in board_modes
+    ]
+    return _run_tasks(_solve_deal_task, tasks, num_workers, on_result)
+
+
+def check_deal(seed: bytes, board_mode, max_states) -> dict:
+    """Pre-check one deal in the current process (see solvability.check)"""
+    solver.AsyncSolver._stop = False
+    random.seed(seed)
+    state = deal_state(seed, board_mode)
+    start = time.perf_counter()
+    verdict, solution = solvability.check(state, max_states)
+    return {
+        "seed": seed.hex(),
+        "board_mode": board_mode,
+        "verdict": verdict,
+        "time_s": time.perf_counter() - start,
+        "moves": solver.solution_moves(solution) if solution is not None else [],
+    }
+
+
+def _check_deal_task(task: tuple) -> dict:
+    try:
+        return check_deal(*task)
+    except Exception as e:
+        print(f"Deal {task[0].hex()} failed: {e}")
+        return {
+            "seed": task[0].hex(),
+            "board_mode": task[1],
+            "verdict": solvability.UNKNOWN,
+            "time_s": 0,
+            "moves": [],
+        }
+
+
+def check_batch(
+    seeds: list[bytes],
+    board_modes=("big",),
+    max_states=solvability.MAX_STATES,
+    num_workers=None,
+    on_result=None,
+) -> list[dict]:
+    """Classify every deal of seeds x board_modes as solvable, unsolvable or
+    unknown, to flag the hopeless ones before spending a solver on them.
+
+    Returns a result of check_deal per deal, in order, calling on_result
+    with each as it comes in.
+    """
+    tasks = [
+        (seed, board_mode, max_states) for seed in seeds for board_mode in board_modes
+    ]
+    return _run_tasks(_check_deal_task, tasks, num_workers, on_result)
+
+
+def _run_tasks(fn, tasks: list[tuple], num_workers, on_result) -> list[dict]:
+    """Map fn over tasks on a pool of processes, in order"""
+    if num_workers is None:
+        num_workers = max(1, multiprocessing.cpu_count() - 1)
+    chunksize = max(1, min(16, len(tasks) // (num_workers * 4)))
+
+    results = []
+    with ProcessPoolExecutor(num_workers) as executor:
+        for result in executor.map(fn, tasks, chunksize=chunksize):
+            if on_result is not None:
+                on_result(result)
+            results.append(result)
+    return results
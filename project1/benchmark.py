@@ -0,0 +1,217 @@
+import argparse
+import csv
+import importlib
+import math
+import time
+
+# Seeds of the deals no solver finished in docs/*.csv. Those runs placed the
+# kings before seeding the shuffle (see controller.create_deck), so a seed gave
+# a different deal each time. Their deals are fixed now, but not all are hard.
+HARD_SEEDS = [
+    "b4803cabcf0261b0",
+    "575f65f0ef978789",
+    "c8ded8c497e912b7",
+    "58ef8288f933cb3e",
+    "8fafe5141cfcd6a9",
+    "648a72ea90a452d4",
+    "9fafbeb5fa1f3d55",
+    "0b37d4930f1ba94e",
+    "59fc81b03888324b",
+    "c9e38a4e97eea7ea",
+    "deefdde0ff7d5888",
+    "0a030674bc04f1ae",
+    "ca24e099c3ffa0dc",
+    "b9240d7fbe7afd06",
+    "db027c44de13441b",
+    "7b571ee1a69d9073",
+    "8028478368d3e6ac",
+]
+
+# Seeds of deals solved in docs/solver_results_gready.csv
+ORDINARY_SEEDS = [
+    "70c6d9987c5f6499",
+    "016bd1999bb2f999",
+    "591647bdec2fffea",
+    "519b31460122a3f8",
+    "cbada74c79c8f8bd",
+    "2bb7a0a8590618cd",
+    "51fd0992bf879e62",
+    "803c7da3a7dae1cb",
+    "79832dc3bb7d3919",
+    "8f7206f48f74b9c2",
+    "7788ff3ec5927b53",
+    "109a4cac5ff03801",
+]
+
+SOLVER_TYPES = [
+    "gready-multi-core",
+    "a*-multi-core",
+    "hda*-multi-core",
+    "gready-single-core",
+    "a*-single-core",
+    "dfs",
+    "dfs-in-place",
+    "idastar",
+    "idastar-in-place",
+    "idastar-f",
+    "bfs",
+    "anytime",
+]
+
+TIME_LIMIT = 60  # Seconds per deal
+MEMORY_LIMIT_MB = 4096  # Peak PSS per deal, solver process and its children
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Linearly interpolated percentile, NaN for no values"""
+    if not values:
+        return math.nan
+    values = sorted(values)
+    pos = (len(values) - 1) * q / 100
+    low = math.floor(pos)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+
+def run_deal(
+    solver_type: str,
+    seed: str,
+    board_mode: str,
+    time_limit: float,
+    memory_limit_mb,
+    profile=False,
+) -> dict:
+    """Solve one deal with AsyncSolver, stopping it at the time/memory limit.
+
+    With profile, the row also has the time and calls of each search phase
+    (see profiler.report), zero if a stopped solver did not get to report.
+    """
+    Solver = importlib.import_module("solver")
+
+    board = importlib.import_module("board").deal_board(bytes.fromhex(seed), board_mode)
+    # Learned costs change the heuristic, so every deal starts without any.
+    # The tie breaks of the heuristic are seeded with the deal; only the
+    # multi-core solvers, whose result depends on process timing, vary.
+    Solver.AsyncSolver.learn.clear()
+    # The solvers' own timeouts match the limit, so that no type gives up
+    # before the others
+    solver = Solver.AsyncSolver(
+        board, solver_type, random_seed=seed, profile=profile, timeout=time_limit
+    )
+    start = time.perf_counter()
+    solver.start()
+
+    status = None
+    while not solver.wait(0.01):  # Returns as soon as the solve ends
+        if time.perf_counter() - start > time_limit:
+            status = "time limit"
+        elif solver.get_max_mem_used() > memory_limit_mb * 2**20:
+            status = "memory limit"
+        if status:
+            solver.stop()
+            solver.process.join(1)
+            break
+    if status is None and solver.process.exitcode not in (None, 0):
+        status = "crashed"
+
+    if status is None:
+        status = "solved" if solver.has_solution() else "unsolved"
+        time_s = solver.get_time_elapsed() / 10**9
+    else:
+        time_s = time.perf_counter() - start
+
+    states = solver.get_states_processed()
+    row = {
+        "solver_type": solver_type,
+        "board_mode": board_mode,
+        "seed": seed,
+        "status": status,
+        "time_s": time_s,
+        "states_processed": states,
+        "states_per_s": states / time_s if time_s else 0,
+        "peak_memory_mb": solver.get_max_mem_used() / 2**20,
+        "moves": solver.get_moves() if status == "solved" else 0,
+    }
+    if profile:
+        phases = solver.profile_report or dict.fromkeys(
+            importlib.import_module("profiler").report(), 0
+        )
+        row.update(phases)
+    return row
+
+
+def summarize(rows: list[dict]) -> list[dict]:
+    """Percentiles of each measure per solver type, over the deals it solved"""
+    summary = []
+    for solver_type in dict.fromkeys(row["solver_type"] for row in rows):
+        runs = [row for row in rows if row["solver_type"] == solver_type]
+        solved = [row for row in runs if row["status"] == "solved"]
+        result = {"solver_type": solver_type, "deals": len(runs), "solved": len(solved)}
+        for measure in ("time_s", "states_per_s", "peak_memory_mb", "moves"):
+            values = [row[measure] for row in solved]
+            for q in PERCENTILES:
+                result[f"{measure}_p{q}"] = percentile(values, q)
+        summary.append(result)
+    return summary
+
+
+def write_csv(rows: list[dict], filename: str):
+    with open(filename, "w", newline="") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=rows[0].keys())
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the solvers")
+    parser.add_argument("--solvers", nargs="+", default=SOLVER_TYPES)
+    parser.add_argument("--board-mode", default="big", choices=["big", "small"])
+    parser.add_argument("--corpus", default="all", choices=["all", "hard", "ordinary"])
+    parser.add_argument("--time-limit", type=float, default=TIME_LIMIT)
+    parser.add_argument("--memory-limit-mb", type=float, default=MEMORY_LIMIT_MB)
+    parser.add_argument("--output", default="benchmark_results.csv")
+    parser.add_argument("--summary", default="benchmark_summary.csv")
+    parser.add_argument(
+        "--profile", action="store_true", help="Time each phase of the searches"
+    )
+    args = parser.parse_args()
+
+    seeds = {
+        "all": HARD_SEEDS + ORDINARY_SEEDS,
+        "hard": HARD_SEEDS,
+        "ordinary": ORDINARY_SEEDS,
+    }[args.corpus]
+
+    rows = []
+    for solver_type in args.solvers:
+        for seed in seeds:
+            row = run_deal(
+                solver_type,
+                seed,
+                args.board_mode,
+                args.time_limit,
+                args.memory_limit_mb,
+                args.profile,
+            )
+            rows.append(row)
+            print(
+                f"{solver_type} {seed}: {row['status']} in {row['time_s']:.2f}s, "
+                f"{row['moves']} moves, {row['peak_memory_mb']:.0f} MB"
+            )
+            write_csv(rows, args.output)
+
+    summary = summarize(rows)
+    write_csv(summary, args.summary)
+    for result in summary:
+        print(
+            f"{result['solver_type']}: {result['solved']}/{result['deals']} solved, "
+            f"time p50 {result['time_s_p50']:.2f}s p90 {result['time_s_p90']:.2f}s, "
+            f"{result['states_per_s_p50']:.0f} states/s, "
+            f"peak memory p90 {result['peak_memory_mb_p90']:.0f} MB, "
+            f"moves p50 {result['moves_p50']:.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
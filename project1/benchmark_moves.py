@@ -0,0 +1,63 @@
+import random
+import sys
+import time
+
+import batchSolver
+import deadlockDetector
+import greadyBfsSolver as bfs
+import solver as Solver
+import telemetry
+
+# Fixed deals so runs can be compared with each other
+SEEDS = [bytes([i] * 8) for i in range(1, 6)]
+MAX_STATES = 5000
+
+
+def run(seed: bytes, a_star: bool, reduction: bool) -> dict:
+    """Expand MAX_STATES nodes of a deal with or without partial-order reduction"""
+    Solver.PARTIAL_ORDER_REDUCTION = reduction
+    random.seed(0)  # Same tie-breaks for both runs
+    root = batchSolver.deal_state(seed)
+    deadlockDetector.start(root)
+    telemetry.stats.reset()
+
+    start = time.perf_counter()
+    bfs.bfs_core(
+        Solver.TreeNode(root),
+        max_states=MAX_STATES,
+        on_solution_fn=lambda node: None,
+        process_id="bench",
+        a_star=a_star,
+    )
+    elapsed = time.perf_counter() - start
+
+    stats = telemetry.stats
+    unique = stats.generated - stats.duplicates
+    return {
+        "expanded": stats.expanded,
+        "generated": stats.generated,
+        "unique": unique,
+        "ratio": stats.generated / unique if unique else 0,
+        "seconds": elapsed,
+    }
+
+
+def main():
+    a_star = "a*" in sys.argv[1:]
+
+    print(f"{'A*' if a_star else 'greedy'} search, {MAX_STATES} states per deal")
+    for seed in SEEDS:
+        for reduction in (False, True):
+            results = run(seed, a_star, reduction)
+            print(
+                f"seed {seed.hex()} {'reduced' if reduction else 'all    '}: "
+                f"{results['expanded']} expanded, {results['generated']} generated, "
+                f"{results['unique']} unique, "
+                f"{results['ratio']:.2f} generated per unique, "
+                f"{results['seconds']:.2f}s"
+            )
+    Solver.PARTIAL_ORDER_REDUCTION = True
+
+
+if __name__ == "__main__":
+    main()
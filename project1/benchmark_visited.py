@@ -0,0 +1,89 @@
+import importlib
+import multiprocessing
+import sys
+import time
+
+import greadyBfsSolver as bfs
+import solver as Solver
+from transpositionTable import TranspositionTable, SharedTranspositionTable
+
+# Fixed deals so runs can be compared with each other
+SEEDS = [bytes([i] * 8) for i in range(1, 6)]
+STATES_PER_WORKER = 5000
+NUM_PROCESSES = max(2, (multiprocessing.cpu_count() - 1) // 2)
+
+
+def expand_worker(start_node, a_star, visited, result_queue):
+    """Expand up to STATES_PER_WORKER nodes and report their state keys"""
+    expanded = []
+    bfs.bfs_core(
+        start_node,
+        max_states=STATES_PER_WORKER,
+        on_solution_fn=lambda node: None,
+        process_id="bench",
+        a_star=a_star,
+        visited=visited,
+        on_expand_fn=lambda node: expanded.append(node.state.key),
+    )
+    result_queue.put(expanded)
+
+
+def run(board, a_star: bool, shared: bool) -> dict:
+    """Split one search between NUM_PROCESSES workers, like bfs_distributed"""
+    visited = (
+        SharedTranspositionTable(bfs.TT_MEMORY_MB)
+        if shared
+        else TranspositionTable(bfs.TT_MEMORY_MB / NUM_PROCESSES)
+    )
+    root = Solver.TreeNode(Solver.cb.CompactBoard.from_board(board.model))
+    initial_nodes = bfs.expand_initial_nodes(
+        root, NUM_PROCESSES, a_star, False, visited
+    )
+
+    start = time.perf_counter()
+    result_queue = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=expand_worker, args=(node, a_star, visited, result_queue)
+        )
+        for node in initial_nodes
+    ]
+    for p in processes:
+        p.start()
+    keys = [key for _ in processes for key in result_queue.get()]
+    for p in processes:
+        p.join()
+    elapsed = time.perf_counter() - start
+
+    if shared:
+        visited.close()
+        visited.unlink()
+
+    unique = len(set(keys))
+    return {
+        "expanded": len(keys),
+        "unique": unique,
+        "duplicate_rate": 1 - unique / len(keys) if keys else 0,
+        "unique_per_s": unique / elapsed,
+    }
+
+
+def main():
+    controller = importlib.import_module("controller")
+    a_star = "a*" in sys.argv[1:]
+
+    print(f"{NUM_PROCESSES} workers, {'A*' if a_star else 'greedy'} search")
+    for seed in SEEDS:
+        board = controller.BoardController(seed=seed)
+        for shared in (False, True):
+            results = run(board, a_star, shared)
+            print(
+                f"seed {seed.hex()} {'shared ' if shared else 'private'}: "
+                f"{results['expanded']} expanded, {results['unique']} unique, "
+                f"{results['duplicate_rate']:.1%} duplicates, "
+                f"{results['unique_per_s']:.0f} unique states/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import solver
 from heapq import *
 import signal
+import deadlockDetector
+import telemetry
 
 
 class BFS:
@@ -19,29 +21,45 @@ class BFS:
         move_card = {
             solver.MoveType.foundation: solver.move_col_foundation,
             solver.MoveType.column: solver.move_col_col,
+            solver.MoveType.run: solver.move_run,
         }
         pq = [root]
-        self.visited_states.add(hash(root.state))
+        self.visited_states.add(root.state.key)
+        stats = telemetry.stats
+        telemetry.track(pq, self.visited_states)
 
         # Check if we should stop
         while pq and not self.should_stop():
-            print(len(pq))
             explored_node = pq.pop(0)
             if explored_node.state.is_game_won():
                 return explored_node
-            moves = solver.get_possible_moves(explored_node.state)
+            moves = solver.get_possible_moves(explored_node.state, explored_node.move)
+            stats.depth = explored_node.actualCost
+            if stats.best_h is None or explored_node.score < stats.best_h:
+                stats.best_h = explored_node.score
 
             for move in moves:
                 # Check if we should stop
 
                 state = move_card[move[0]](explored_node.state, move[1], move[2])
+                if state is None:
+                    continue
+                stats.generated += 1
 
-                if state is not None and hash(state) not in self.visited_states:
-                    self.visited_states.add(hash(explored_node.state))
+                if state.key in self.visited_states:
+                    stats.duplicates += 1
+                else:
+                    self.visited_states.add(state.key)
+                    if deadlockDetector.is_dead(state, move):
+                        stats.dead += 1
+                        continue
                     node = solver.TreeNode(state, explored_node)
                     explored_node.add_child(node, move)
                     pq.append(node)
 
+            stats.expanded += 1
+            stats.open_size = len(pq)
+
         return None
 
 
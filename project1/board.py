@@ -1,3 +1,5 @@
+import random
+
 import cards as c
 
 
@@ -157,3 +159,59 @@ class Board:
             and self.foundations == other.foundations
             and self.columns == other.columns
         )
+
+
+def shuffle_deck(seed: bytes, top_value: int) -> list[c.Card]:
+    """Cards from Ace to top_value in dealing order, four per column.
+
+    The top_value cards go first, one per suit, each at the bottom of a
+    random column; the other cards are shuffled around them.
+    """
+    r = random.Random(seed)
+    deck = [
+        c.Card(c.CardValue(i // 4 + 1), c.CardSuite(i % 4))
+        for i in range((top_value - 1) * 4)
+    ]
+    tops = [
+        c.Card(c.CardValue(top_value), c.CardSuite(suite))
+        for suite in c.CardSuite.get_suites()
+    ]
+
+    size = top_value * 4
+    pos = set()
+    for _ in range(len(tops)):
+        choice = r.randrange(0, size, 4)
+        while choice in pos:
+            choice += 1
+        pos.add(choice)
+
+    shuffled_deck = [None] * size
+    for i, p in enumerate(pos):
+        shuffled_deck[p] = tops[i]
+
+    r.shuffle(deck)
+
+    i = 0
+    for j in range(size):
+        if shuffled_deck[j] is None:
+            shuffled_deck[j] = deck[i]
+            i += 1
+
+    return shuffled_deck
+
+
+def create_deck(seed: bytes) -> list[c.Card]:
+    """The 52 cards of a big deal, 13 columns of 4"""
+    return shuffle_deck(seed, c.CardValue.king)
+
+
+def create_mini_deck(seed: bytes) -> list[c.Card]:
+    """The 16 cards of a small deal, Ace to 4, 4 columns of 4"""
+    return shuffle_deck(seed, 4)
+
+
+def deal_board(seed: bytes, board_mode="big") -> Board:
+    """Starting board of a deal, the same as BoardController deals for a seed"""
+    deck = create_mini_deck(seed) if board_mode == "small" else create_deck(seed)
+    columns = [CardColumn(deck[i : i + 4]) for i in range(0, len(deck), 4)]
+    return Board(columns, [Foundation() for _ in range(4)], mode=board_mode)
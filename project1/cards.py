@@ -60,6 +60,14 @@ class Card:
     def next(self):
         return CardValue(self.cardValue.value + 1)
 
+    def to_int(self) -> int:
+        """Encode the card as a small int (0..51), in the same order create_deck uses."""
+        return (self.cardValue.value - 1) * 4 + self.cardSuite.value
+
+    @staticmethod
+    def from_int(card: int) -> "Card":
+        return Card(CardValue(card // 4 + 1), CardSuite(card % 4))
+
     def __str__(self):
         return self.cardValue.__str__() + "_of_" + self.cardSuite.__str__()
 
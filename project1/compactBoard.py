@@ -0,0 +1,277 @@
+import random
+import board as b
+import cards as c
+
+EMPTY = 0xFF  # Empty foundation / column top
+HEADER = 5  # Column count + four foundation tops
+BOTTOM = 52  # "Card" below the bottom card of a column
+
+# Zobrist keys. A column card is keyed by the card right below it, so the XOR
+# over all cards describes each column but not where the column is on the
+# board. Foundations are keyed by their top card only. The fixed seed keeps
+# keys identical across solver processes and runs (learn.data relies on it).
+_rng = random.Random(0x5EED)
+COLUMN_KEYS = [[_rng.getrandbits(64) for card in range(52)] for below in range(53)]
+FOUNDATION_KEYS = [_rng.getrandbits(64) for card in range(52)] + [0] * (EMPTY + 1 - 52)
+
+
+def compute_key(data: bytes) -> int:
+    """Full Zobrist key of a packed board, only needed for new root states."""
+    key = 0
+    for top in data[1:HEADER]:
+        key ^= FOUNDATION_KEYS[top]
+
+    pos = HEADER + data[0]
+    for length in data[HEADER : HEADER + data[0]]:
+        below = BOTTOM
+        for card in data[pos : pos + length]:
+            key ^= COLUMN_KEYS[below][card]
+            below = card
+        pos += length
+    return key
+
+
+class CompactBoard:
+    """Byte-packed Board used by the solvers.
+
+    Cards are stored as ints (see cards.Card.to_int) inside a single bytes
+    object laid out as:
+
+        [n_columns][4 foundation tops][n_columns lengths][cards ...]
+
+    Column cards are stored bottom to top, one column after the other.
+    Foundations only keep their top card since they are always built from the
+    Ace up in a single suit.
+    """
+
+    __slots__ = ("data", "mode", "key")
+
+    def __init__(self, data: bytes, mode="big", key: int | None = None):
+        self.data = data
+        self.mode = mode
+        # Zobrist key, updated incrementally by the move methods
+        self.key = compute_key(data) if key is None else key
+
+    @staticmethod
+    def from_board(board: b.Board) -> "CompactBoard":
+        tops = [
+            found.top().to_int() if found.top() is not None else EMPTY
+            for found in board.foundations
+        ]
+        lengths = [len(col.cards) for col in board.columns]
+        cards = [card.to_int() for col in board.columns for card in col.cards]
+        return CompactBoard(
+            bytes([len(board.columns), *tops, *lengths, *cards]), board.mode
+        )
+
+    def to_board(self) -> b.Board:
+        foundations = [
+            (
+                b.Foundation(
+                    c.Card.from_int(card) for card in range(top % 4, top + 1, 4)
+                )
+                if top != EMPTY
+                else b.Foundation()
+            )
+            for top in self.foundation_tops()
+        ]
+        columns = [
+            b.CardColumn(c.Card.from_int(card) for card in column)
+            for column in self.columns()
+        ]
+        return b.Board(columns, foundations, self.mode)
+
+    def n_columns(self) -> int:
+        return self.data[0]
+
+    def foundation_tops(self) -> bytes:
+        return self.data[1:HEADER]
+
+    def column_lengths(self) -> bytes:
+        return self.data[HEADER : HEADER + self.data[0]]
+
+    def _offset(self, col: int) -> int:
+        """Index in data of the bottom card of a column."""
+        data = self.data
+        return HEADER + data[0] + sum(data[HEADER : HEADER + col])
+
+    def column(self, col: int) -> bytes:
+        start = self._offset(col)
+        return self.data[start : start + self.data[HEADER + col]]
+
+    def columns(self) -> list[bytes]:
+        data = self.data
+        pos = HEADER + data[0]
+        columns = []
+        for length in data[HEADER : HEADER + data[0]]:
+            columns.append(data[pos : pos + length])
+            pos += length
+        return columns
+
+    def top(self, col: int) -> int:
+        length = self.data[HEADER + col]
+        return self.data[self._offset(col) + length - 1] if length else EMPTY
+
+    def tops(self) -> list[int]:
+        data = self.data
+        pos = HEADER + data[0]
+        tops = []
+        for length in data[HEADER : HEADER + data[0]]:
+            pos += length
+            tops.append(data[pos - 1] if length else EMPTY)
+        return tops
+
+    def is_valid_move_column_to_column(self, from_col: int, to_col: int) -> bool:
+        card = self.top(from_col)
+        target = self.top(to_col)
+        return card != EMPTY and target != EMPTY and target // 4 == card // 4 + 1
+
+    def is_valid_move_column_to_foundation(self, col: int, found: int) -> bool:
+        card = self.top(col)
+        top = self.data[1 + found]
+        if card == EMPTY:
+            return False
+        return card < 4 if top == EMPTY else card == top + 4
+
+    def move_col_col(self, from_col: int, to_col: int) -> "CompactBoard | None":
+        """Return the board after moving a card between columns, None if invalid."""
+        if from_col == to_col or not self.is_valid_move_column_to_column(
+            from_col, to_col
+        ):
+            return None
+
+        data = bytearray(self.data)
+        src = self._offset(from_col) + data[HEADER + from_col] - 1
+        dst = self._offset(to_col) + data[HEADER + to_col]
+        card = data[src]
+        below = data[src - 1] if data[HEADER + from_col] > 1 else BOTTOM
+        key = self.key ^ COLUMN_KEYS[below][card] ^ COLUMN_KEYS[data[dst - 1]][card]
+        del data[src]
+        data.insert(dst - 1 if dst > src else dst, card)
+        data[HEADER + from_col] -= 1
+        data[HEADER + to_col] += 1
+        return CompactBoard(bytes(data), self.mode, key)
+
+    def move_col_foundation(
+        self, from_col: int, to_found: int
+    ) -> "CompactBoard | None":
+        """Return the board after moving a card to a foundation, None if invalid."""
+        if not self.is_valid_move_column_to_foundation(from_col, to_found):
+            return None
+
+        data = bytearray(self.data)
+        src = self._offset(from_col) + data[HEADER + from_col] - 1
+        card = data[src]
+        below = data[src - 1] if data[HEADER + from_col] > 1 else BOTTOM
+        key = (
+            self.key
+            ^ COLUMN_KEYS[below][card]
+            ^ FOUNDATION_KEYS[data[1 + to_found]]
+            ^ FOUNDATION_KEYS[card]
+        )
+        data[1 + to_found] = card
+        del data[src]
+        data[HEADER + from_col] -= 1
+        return CompactBoard(bytes(data), self.mode, key)
+
+    def move_run(self, from_cols: bytes, to_founds: bytes) -> "CompactBoard | None":
+        """Return the board after moving cards to foundations one after the
+        other, from from_cols[i] to to_founds[i], None if any is invalid.
+        """
+        state = self.mutable_copy()
+        for from_col, to_found in zip(from_cols, to_founds):
+            if not state.apply_col_foundation(from_col, to_found):
+                return None
+        return state.frozen_copy()
+
+    # In-place moves, used by the make/unmake search modes. They need a board
+    # backed by a bytearray (see mutable_copy), whose key changes as it is
+    # played on, so it must not be stored in sets or dicts.
+
+    def mutable_copy(self) -> "CompactBoard":
+        return CompactBoard(bytearray(self.data), self.mode, self.key)
+
+    def frozen_copy(self) -> "CompactBoard":
+        return CompactBoard(bytes(self.data), self.mode, self.key)
+
+    def _transfer(self, from_col: int, to_col: int, check=True) -> bool:
+        """Move the top card of from_col onto to_col in place.
+
+        With check, the move must follow the column rules (one rank lower, not
+        onto an empty column); undo moves skip it.
+        """
+        data = self.data
+        from_len = data[HEADER + from_col]
+        to_len = data[HEADER + to_col]
+        if from_col == to_col or not from_len:
+            return False
+
+        src = self._offset(from_col) + from_len - 1
+        dst = self._offset(to_col) + to_len  # Position after the top card
+        card = data[src]
+        target = data[dst - 1] if to_len else BOTTOM
+        if check and (not to_len or target // 4 != card // 4 + 1):
+            return False
+
+        below = data[src - 1] if from_len > 1 else BOTTOM
+        self.key ^= COLUMN_KEYS[below][card] ^ COLUMN_KEYS[target][card]
+        del data[src]
+        data.insert(dst - 1 if dst > src else dst, card)
+        data[HEADER + from_col] -= 1
+        data[HEADER + to_col] += 1
+        return True
+
+    def apply_col_col(self, from_col: int, to_col: int) -> bool:
+        """Move a card between columns in place, False if the move is invalid."""
+        return self._transfer(from_col, to_col)
+
+    def undo_col_col(self, from_col: int, to_col: int):
+        self._transfer(to_col, from_col, check=False)
+
+    def apply_col_foundation(self, from_col: int, to_found: int) -> bool:
+        """Move a card to a foundation in place, False if the move is invalid."""
+        data = self.data
+        length = data[HEADER + from_col]
+        if not length:
+            return False
+
+        src = self._offset(from_col) + length - 1
+        card = data[src]
+        top = data[1 + to_found]
+        if not (card < 4 if top == EMPTY else card == top + 4):
+            return False
+
+        below = data[src - 1] if length > 1 else BOTTOM
+        self.key ^= (
+            COLUMN_KEYS[below][card] ^ FOUNDATION_KEYS[top] ^ FOUNDATION_KEYS[card]
+        )
+        data[1 + to_found] = card
+        del data[src]
+        data[HEADER + from_col] -= 1
+        return True
+
+    def undo_col_foundation(self, from_col: int, to_found: int):
+        data = self.data
+        card = data[1 + to_found]
+        top = card - 4 if card >= 4 else EMPTY
+        length = data[HEADER + from_col]
+        dst = self._offset(from_col) + length
+        below = data[dst - 1] if length else BOTTOM
+        self.key ^= (
+            COLUMN_KEYS[below][card] ^ FOUNDATION_KEYS[top] ^ FOUNDATION_KEYS[card]
+        )
+        data[1 + to_found] = top
+        data.insert(dst, card)
+        data[HEADER + from_col] += 1
+
+    def is_game_won(self) -> bool:
+        last = 4 if self.mode == "small" else c.CardValue.king
+        return all(
+            top != EMPTY and top // 4 + 1 == last for top in self.foundation_tops()
+        )
+
+    def __hash__(self):
+        return self.key
+
+    def __eq__(self, other):
+        return isinstance(other, CompactBoard) and self.data == other.data
@@ -73,79 +73,18 @@ class FoundationController:
         return False
 
 
-def create_deck(seed: bytes) -> tuple[list[CardController], bytes]:
-    deck = [
-        CardController(c.CardValue(i // 4 + 1), c.CardSuite(i % 4)) for i in range(48)
+def create_deck(seed: bytes) -> list[CardController]:
+    return [
+        CardController(card.cardValue, card.cardSuite) for card in b.create_deck(seed)
     ]
-    kings = [
-        CardController(c.CardValue(c.CardValue.king), c.CardSuite(suite))
-        for suite in c.CardSuite.get_suites()
-    ]
-    pos = set()
-    for i in range(len(kings)):
-        choice = r.randrange(0, 52, 4)
-        while choice in pos:
-            choice += 1
-        pos.add(choice)
-
-    shuffled_deck = [None for i in range(52)]
-
-    i = 0
-    for p in pos:
-        shuffled_deck[p] = kings[i]
-        i += 1
-
-    r.seed(seed)
-    r.shuffle(deck)
-
-    i = 0
-
-    for j in range(len(shuffled_deck)):
-        if shuffled_deck[j] == None:
-            shuffled_deck[j] = deck[i]
-            i += 1
-
-    return shuffled_deck
 
 
 def create_mini_deck(seed: bytes) -> list[CardController]:
-    # Create all cards from Ace (1) to 3 for all 4 suits → total 12 cards
-    r.seed(seed)
-
-    deck = [
-        CardController(c.CardValue(i // 4 + 1), c.CardSuite(i % 4)) for i in range(12)
+    return [
+        CardController(card.cardValue, card.cardSuite)
+        for card in b.create_mini_deck(seed)
     ]
 
-    # Create the 4s (one per suit)
-    fours = [
-        CardController(c.CardValue(4), c.CardSuite(suite))
-        for suite in c.CardSuite.get_suites()
-    ]
-
-    # Pick unique positions in deck to insert 4s
-    pos = set()
-    for i in range(4):
-        choice = r.randrange(0, 16, 4)
-        while choice in pos:
-            choice += 1
-        pos.add(choice)
-
-    # Prepare final deck of 16 cards
-    shuffled_deck = [None] * 16
-
-    for i, p in enumerate(pos):
-        shuffled_deck[p] = fours[i]
-
-    r.shuffle(deck)
-
-    i = 0
-    for j in range(len(shuffled_deck)):
-        if shuffled_deck[j] is None:
-            shuffled_deck[j] = deck[i]
-            i += 1
-
-    return shuffled_deck
-
 
 class BoardController:
 
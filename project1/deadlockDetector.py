@@ -0,0 +1,99 @@
+import compactBoard as cb
+
+
+class DeadlockDetector:
+    """Finds the boards of a deal that can no longer be won.
+
+    A card is stuck when it can only leave its column for a foundation: its
+    every card one rank higher is on a foundation or below it in its
+    column, so no column can take it. Kings, which no card takes, always
+    are. A stuck card has to reach its foundation before the cards below
+    it, which along with the order of each suit can make the game
+    impossible to win.
+
+    The cards under a King are not stuck for it: they wait for the King to
+    reach its foundation, but may then go on other columns.
+    """
+
+    def __init__(self, root: cb.CompactBoard):
+        self.last = (4 if root.mode == "small" else 13) - 1  # Rank of the Kings
+        self.dead_root = False
+        self.dead_root = self.is_dead(root)
+
+    def is_dead(self, state: cb.CompactBoard, move=None) -> bool:
+        """True if state can not be won.
+
+        The move that led to state is not needed, the stuck cards are found
+        from the board itself.
+        """
+        if self.dead_root:
+            return True
+        return self.relaxed_loss(state)
+
+    def relaxed_loss(self, state: cb.CompactBoard) -> bool:
+        """Plays out a relaxed game where the cards that are not stuck can be
+        taken away at any time: if even that leaves a suit unfinished, so
+        does every real game from state.
+        """
+        last = self.last
+        columns = state.columns()
+
+        remaining = [0] * (last + 2)  # Cards of each rank in the columns
+        for column in columns:
+            for card in column:
+                remaining[card // 4] += 1
+
+        position = dict()  # Card: column and height
+        stuck = []  # Heights of the stuck cards of each column, bottom first
+        for col, column in enumerate(columns):
+            below = [0] * (last + 2)
+            heights = []
+            for height, card in enumerate(column):
+                rank = card // 4
+                position[card] = (col, height)
+                if below[rank + 1] == remaining[rank + 1]:
+                    heights.append(height)
+                below[rank] += 1
+            stuck.append(heights)
+
+        nexts = list(range(4))  # Next card of each suit, Aces to start with
+        for top in state.foundation_tops():
+            if top != cb.EMPTY:
+                nexts[top % 4] = top + 4
+
+        # The stuck cards of a column leave it from the top down, and a card
+        # can be played once the stuck cards above it are gone
+        progress = True
+        while progress:
+            progress = False
+            for suit in range(4):
+                card = nexts[suit]
+                while card // 4 <= last:
+                    col, height = position[card]
+                    heights = stuck[col]
+                    if heights and heights[-1] > height:
+                        break
+                    if heights and heights[-1] == height:
+                        heights.pop()
+                    card += 4
+                    progress = True
+                nexts[suit] = card
+        return any(card // 4 <= last for card in nexts)
+
+
+detector = None  # Of the deal searched in this process, see start
+
+
+def start(root: cb.CompactBoard) -> bool:
+    """Set up detection for the deal of root, returning whether root is dead"""
+    global detector
+    detector = DeadlockDetector(root)
+    return detector.dead_root
+
+
+def is_dead(state: cb.CompactBoard, move=None) -> bool:
+    """True if state, reached by move, can not be won.
+
+    False if unsure or detection is not set up for this process.
+    """
+    return detector is not None and detector.is_dead(state, move)
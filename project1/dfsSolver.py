@@ -1,12 +1,15 @@
 import solver
 from heapq import *
 import signal
+import deadlockDetector
+import telemetry
 
 
 class DFS:
-    def __init__(self, board):
+    def __init__(self, board, in_place=False):
         self.visited_states = set()
         self.root = solver.TreeNode(board)
+        self.in_place = in_place
         self._stop_flag = False
 
     def set_stop_flag(self):
@@ -20,8 +23,9 @@ class DFS:
         move_card = {
             solver.MoveType.foundation: solver.move_col_foundation,
             solver.MoveType.column: solver.move_col_col,
+            solver.MoveType.run: solver.move_run,
         }
-        self.visited_states.add(hash(root.state))
+        self.visited_states.add(root.state.key)
         pq = []
 
         if root.state.is_game_won():
@@ -32,7 +36,11 @@ class DFS:
         if self.should_stop():
             return None
 
-        moves = solver.get_possible_moves(root.state)
+        moves = solver.get_possible_moves(root.state, root.move)
+        stats = telemetry.stats
+        stats.depth = root.actualCost
+        if stats.best_h is None or root.score < stats.best_h:
+            stats.best_h = root.score
 
         for move in moves:
             # Check if we should stop
@@ -40,12 +48,22 @@ class DFS:
                 return None
 
             state = move_card[move[0]](root.state, move[1], move[2])
-
-            if state is not None and hash(state) not in self.visited_states:
+            if state is None:
+                continue
+            stats.generated += 1
+
+            if state.key in self.visited_states:
+                stats.duplicates += 1
+            elif deadlockDetector.is_dead(state, move):
+                stats.dead += 1
+            else:
                 node = solver.TreeNode(state, root)
                 root.add_child(node, move)
                 pq.append(node)
 
+        stats.expanded += 1
+        stats.open_size = len(pq)
+
         sol = None
         while pq and not self.should_stop():
             node = pq.pop()
@@ -53,14 +71,67 @@ class DFS:
 
         return sol
 
-
-# This function is used by the AsyncSolver to run IDA*
-def run_dfs(board):
-    solver = DFS(board)
+    def dfs_in_place(self, root: solver.TreeNode) -> solver.TreeNode:
+        """Same search as dfs, but plays and takes back moves on a single board.
+
+        Only the current path is kept in memory. TreeNodes are built for the
+        solution path once it is found.
+        """
+        state = root.state.mutable_copy()
+        self.visited_states.add(state.key)
+        path = []
+        stack = [solver.get_possible_moves(state, root.move)]
+        stats = telemetry.stats
+        stats.expanded += 1
+        stats.open_size = len(stack[0])
+
+        while stack and not self.should_stop():
+            if state.is_game_won():
+                return solver.replay_moves(root, path)
+
+            moves = stack[-1]
+            if not moves:
+                stack.pop()
+                if path:
+                    solver.undo_move(state, path.pop())
+                continue
+
+            # Last generated move first, like the stack used by dfs
+            move = moves.pop()
+            stats.open_size -= 1  # Moves left on the stack
+            stats.generated += 1
+            solver.apply_move(state, move)
+            if state.key in self.visited_states:
+                stats.duplicates += 1
+                solver.undo_move(state, move)
+                continue
+
+            self.visited_states.add(state.key)
+            if deadlockDetector.is_dead(state, move):
+                stats.dead += 1
+                solver.undo_move(state, move)
+                continue
+
+            path.append(move)
+            stack.append(solver.get_possible_moves(state, move))
+            stats.expanded += 1
+            stats.open_size += len(stack[-1])
+            stats.depth = len(path)
+
+        return None
+
+    def run(self) -> solver.TreeNode:
+        telemetry.track(None, self.visited_states)
+        return self.dfs_in_place(self.root) if self.in_place else self.dfs(self.root)
+
+
+# This function is used by the AsyncSolver to run DFS
+def run_dfs(board, in_place=False):
+    solver = DFS(board, in_place)
 
     def signal_handler(*args):
         solver.set_stop_flag()
 
     signal.signal(signal.SIGTERM, signal_handler)
 
-    return solver.dfs(solver.root)
+    return solver.run()
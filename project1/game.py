@@ -2,6 +2,7 @@ import pygame
 import view as v
 import controller as control
 from solver import AsyncSolver, execute_next_move, get_next_move
+from solverPool import SolverPool
 import utils
 from stopwatch import Stopwatch
 from pause_menu import PauseMenu
@@ -43,11 +44,14 @@ class SolitaireGame:
         self.game_board = control.BoardController(board_mode=self.board_mode, seed=SEED)
         self.game_bar = v.GameBar(self)
 
-        # AI solver
-        self.solver = AsyncSolver(
-            self.game_board, "dfs" if board_mode == "small" else "gready-multi-core"
-        )
-        self.solver.start()
+        # AI solver, on worker processes kept for the whole game. On big
+        # boards the anytime solver makes the AI ready with its first
+        # solution, which gets shorter while it keeps searching.
+        self.solver_type = "dfs" if board_mode == "small" else "anytime"
+        self.solver_pool = SolverPool()
+        self.solver_pool.start()
+        self.solver = self.new_solver()
+        self.start_solver()
         self.board_state = hash(self.game_board.model)
 
         # Create pause menu
@@ -79,8 +83,9 @@ class SolitaireGame:
         self.game_stopwatch.reset()
         self.game_stopwatch.start()
         self.solver.stop()
-        self.solver = AsyncSolver(self.game_board)
-        self.solver.start()
+        self.game_bar.ai_ready(False)
+        self.solver = self.new_solver()
+        self.start_solver()
         self.board_state = hash(self.game_board.model)
         self.game_paused = False
         self.pause_menu.hide()
@@ -208,19 +213,35 @@ class SolitaireGame:
         if sol is not None:
             get_next_move(sol, self.game_board).view.glow(True)
 
-    def update_ai(self):
-        """Update AI solver state and execute AI moves"""
-        if self.solver.has_solution():
+    def new_solver(self) -> AsyncSolver:
+        return AsyncSolver(
+            self.game_board, self.solver_type, pool=self.solver_pool, precheck=True
+        )
+
+    def start_solver(self):
+        """Start the current solver, enabling the AI buttons once it has a solution"""
+        self.solver.add_solution_callback(self.on_solution_found)
+        self.solver.add_done_callback(self.on_solver_done)
+        self.solver.start()
+
+    def on_solution_found(self, solver):
+        # Called from the solver's thread; a replaced solver is ignored
+        if solver is self.solver:
             self.game_bar.ai_ready(True)
-        else:
-            self.game_bar.ai_ready(False)
 
+    def on_solver_done(self, solver):
+        # Called from the solver's thread; a replaced solver is ignored
+        if solver is self.solver:
+            self.game_bar.ai_ready(solver.has_solution())
+
+    def update_ai(self):
+        """Update AI solver state and execute AI moves"""
         if hash(self.game_board.model) != self.board_state:
             # Board state changed by user, restart solver
             self.game_bar.ai_ready(False)
             self.solver.stop()
-            self.solver = AsyncSolver(self.game_board)
-            self.solver.start()
+            self.solver = self.new_solver()
+            self.start_solver()
             self.board_state = hash(self.game_board.model)
 
         if self.ai_paused or not self.use_ai or self.game_paused:
@@ -239,6 +260,8 @@ class SolitaireGame:
         if hasattr(self, "solver") and self.solver:
             self.solver.stop()
             self.solver.save_data()
+        if hasattr(self, "solver_pool"):
+            self.solver_pool.shutdown()
 
     def display_win_message(self):
         # Get the time in seconds
@@ -1,19 +1,30 @@
 from heapq import *
 import solver
 import multiprocessing
-import pickle
+import queue
 import time
 import os
 import signal
+import deadlockDetector
+import profiler
+import telemetry
+from transpositionTable import TranspositionTable, SharedTranspositionTable
 
 # Global tracking for processes
 _all_processes = []  # (process, stop_event) pairs
 
 
 class TreeNode(solver.TreeNode):
+    __slots__ = ()
+
     def evaluate(self, state):
         return super().evaluate(state) + self.actualCost
 
+    @classmethod
+    def evaluate_batch(cls, states, parent):
+        cost = parent.actualCost + 1
+        return [score + cost for score in super().evaluate_batch(states, parent)]
+
 
 def terminate_all_processes():
     """Terminate all running BFS solver processes"""
@@ -62,7 +73,7 @@ def kill_all(*args):
         os._exit(1)
 
 
-visited_states = set()
+TT_MEMORY_MB = 512  # Memory cap of the visited-state table of a search
 
 
 # Core BFS algorithm - shared between all implementations
@@ -74,29 +85,44 @@ def bfs_core(
     process_id=0,
     visit_nodes=-1,
     a_star=False,
+    batch_eval=False,
+    visited=None,
+    on_expand_fn=None,
 ):
     """[:max_moves_per_state]led with solution node if found
         process_id: ID for logging
         max_moves_per_state: How many moves to consider from each state
+        batch_eval: Score all children of a node at once with batchHeuristic
+        visited: TranspositionTable to use, a new TT_MEMORY_MB one by default
+        on_expand_fn: Called with each node before it is expanded
+        start_node may also be a list of nodes to search from together
 
     Returns:
         Solution node if found and on_solution_fn is None, otherwise None
     """
     # Initialize defaults
-    global visited_states
-    visited_states.add(hash(start_node.state))
+    if visited is None:
+        visited = TranspositionTable(TT_MEMORY_MB)
+    start_nodes = start_node if isinstance(start_node, list) else [start_node]
+    for node in start_nodes:
+        visited.visit(node.state.key, node.actualCost)
 
     if stop_check_fn is None:
         stop_check_fn = lambda: False  # Never stop by default
 
     # Set up queue and counters
-    queue = [start_node]
+    queue = list(start_nodes)
+    heapify(queue)
     states_processed = 0
+    node_class = TreeNode if a_star else solver.TreeNode
+    stats = telemetry.stats
+    telemetry.track(queue, visited)
 
     # Move function mapping - avoid repeated lookups
     move_card = {
         solver.MoveType.foundation: solver.move_col_foundation,
         solver.MoveType.column: solver.move_col_col,
+        solver.MoveType.run: solver.move_run,
     }
 
     # Main BFS loop
@@ -104,6 +130,12 @@ def bfs_core(
         while queue and not stop_check_fn() and states_processed < max_states:
             current_board = heappop(queue)
 
+            # Skip A* nodes whose state was reopened with a cheaper path since
+            if a_star:
+                best = visited.get(current_board.state.key)
+                if best is not None and best < current_board.actualCost:
+                    continue
+
             # Check win condition
             if current_board.state.is_game_won():
                 print(f"BFS Core {process_id} found solution!")
@@ -115,8 +147,19 @@ def bfs_core(
             elif visit_nodes != -1 and len(queue) >= visit_nodes:
                 return queue
 
+            if on_expand_fn:
+                on_expand_fn(current_board)
+
+            h = current_board.score
+            if a_star:
+                h -= current_board.actualCost
+            if stats.best_h is None or h < stats.best_h:
+                stats.best_h = h
+            stats.depth = current_board.actualCost
+
             # Get and explore possible moves
-            moves = solver.get_possible_moves(current_board.state)
+            moves = solver.get_possible_moves(current_board.state, current_board.move)
+            children = []
             for move in moves:
                 # Check if we should stop
                 if stop_check_fn():
@@ -126,20 +169,32 @@ def bfs_core(
                 state = move_card[move[0]](current_board.state, move[1], move[2])
                 if state is None:
                     continue
+                stats.generated += 1
 
-                # Check if already visited
-                state_hash = hash(state)
-                if state_hash in visited_states:
+                # Check if already visited (A* reopens states reached more cheaply)
+                if not visited.visit(
+                    state.key, current_board.actualCost + 1, reopen=a_star
+                ):
+                    stats.duplicates += 1
+                    continue
+                if deadlockDetector.is_dead(state, move):
+                    stats.dead += 1
                     continue
 
-                visited_states.add(state_hash)
+                children.append((state, move))
 
-                # Create new node and link to parent
-                node = (
-                    TreeNode(state, current_board)
-                    if a_star
-                    else solver.TreeNode(state, current_board)
+            # Score the new states, all at once if batching
+            scores = (
+                node_class.evaluate_batch(
+                    [state for state, _ in children], current_board
                 )
+                if batch_eval and children
+                else [None] * len(children)
+            )
+
+            for (state, move), score in zip(children, scores):
+                # Create new node and link to parent
+                node = node_class(state, current_board, score)
 
                 current_board.add_child(node, move)
 
@@ -148,6 +203,8 @@ def bfs_core(
 
             # Update counters and periodically check stopping condition
             states_processed += 1
+            stats.expanded += 1
+            stats.open_size = len(queue)
             if states_processed % 100 == 0 and stop_check_fn():
                 return None, states_processed
 
@@ -166,7 +223,11 @@ def bfs_core(
 
 
 def expand_initial_nodes(
-    root: solver.TreeNode, num_nodes: int, a_star: bool
+    root: solver.TreeNode,
+    num_nodes: int,
+    a_star: bool,
+    batch_eval=False,
+    visited=None,
 ) -> list[solver.TreeNode]:
     """Expand the root node to create starting points for different processes"""
 
@@ -176,15 +237,31 @@ def expand_initial_nodes(
         max_states=num_nodes * 10,  # Higher limit to find enough nodes
         visit_nodes=num_nodes,
         a_star=a_star,
+        batch_eval=batch_eval,
+        visited=visited,
     )
 
     # If we couldn't expand enough, just use what we have
     return initial_nodes if initial_nodes else [root]
 
 
-def bfs_process_worker(start_node, process_id, solution_queue, stop_event, a_star):
-    """Worker process that performs BFS from a given starting node"""
+def bfs_process_worker(
+    start_node,
+    process_id,
+    solution_queue,
+    stop_event,
+    a_star,
+    batch_eval=False,
+    visited=None,
+):
+    """Worker process that performs BFS from a given starting node.
+
+    Puts ("solution", packed solution) in the solution queue for each one
+    found and, when profiling, ("profile", profiler report) once it ends.
+    """
     print(f"Process {process_id} starting BFS from depth {start_node.actualCost}")
+    telemetry.start_child()
+    profiler.start_child()
 
     # Set up signal handler for clean termination
     should_exit = False
@@ -202,7 +279,7 @@ def bfs_process_worker(start_node, process_id, solution_queue, stop_event, a_sta
     # Create solution handler function
     def on_solution(solution_node):
         try:
-            solution_queue.put(pickle.dumps(solution_node))
+            solution_queue.put(("solution", solver.pack_solution(solution_node)))
         except Exception as e:
             print(f"Process {process_id} failed to queue solution: {e}")
 
@@ -214,11 +291,31 @@ def bfs_process_worker(start_node, process_id, solution_queue, stop_event, a_sta
         on_solution_fn=on_solution,
         process_id=process_id,
         a_star=a_star,
+        batch_eval=batch_eval,
+        visited=visited,
     )
+    telemetry.stop()
+    report = profiler.child_report()
+    if report is not None:
+        solution_queue.put(("profile", report))
+
+
+def bfs_distributed(
+    root: solver.TreeNode,
+    a_star: bool,
+    batch_eval=False,
+    tt_memory_mb=TT_MEMORY_MB,
+    shared_visited=True,
+    num_processes=None,
+    timeout=60,
+) -> solver.TreeNode | None:
+    """BFS implementation that distributes different starting nodes across processes
 
-
-def bfs_distributed(root: solver.TreeNode, a_star: bool) -> solver.TreeNode | None:
-    """BFS implementation that distributes different starting nodes across processes"""
+    With shared_visited, all processes check and record states in one
+    SharedTranspositionTable, so no state is expanded by more than one of them.
+    Otherwise each process gets its own copy of the states seen so far.
+    Gives up after timeout seconds without a solution.
+    """
     print("Using distributed BFS with multiprocessing")
     global _all_processes
 
@@ -226,27 +323,51 @@ def bfs_distributed(root: solver.TreeNode, a_star: bool) -> solver.TreeNode | No
     terminate_all_processes()
 
     # Determine number of processes
-    num_processes = max(1, (multiprocessing.cpu_count() - 1) // 2)
+    if num_processes is None:
+        num_processes = max(1, (multiprocessing.cpu_count() - 1) // 2)
 
-    # Create initial nodes for distribution
-    initial_nodes = expand_initial_nodes(root, num_processes, a_star)
-
-    # Check for immediate solution in initial nodes
-    for node in initial_nodes:
-        if node.state.is_game_won():
-            return node
+    if shared_visited:
+        try:
+            visited = SharedTranspositionTable(tt_memory_mb)
+        except MemoryError as e:
+            print(f"{e}, using a table per process")
+            shared_visited = False
+    if not shared_visited:
+        # The memory cap is split between the copies
+        visited = TranspositionTable(tt_memory_mb / num_processes)
 
     # Set up multiprocessing resources
     solution_queue = multiprocessing.Queue()
     stop_event = multiprocessing.Event()
     run_processes = []
+    solution = None
+    reports = []  # Profiler reports of the workers
+    waited_from = time.time()
 
     try:
+        # Create initial nodes for distribution
+        initial_nodes = expand_initial_nodes(
+            root, num_processes, a_star, batch_eval, visited
+        )
+
+        # Check for immediate solution in initial nodes
+        for node in initial_nodes:
+            if node.state.is_game_won():
+                return node
+
         # Start a BFS process for each initial node
         for i, node in enumerate(initial_nodes):
             process = multiprocessing.Process(
                 target=bfs_process_worker,
-                args=(node, i, solution_queue, stop_event, a_star),
+                args=(
+                    node,
+                    i,
+                    solution_queue,
+                    stop_event,
+                    a_star,
+                    batch_eval,
+                    visited,
+                ),
             )
             process.daemon = True
             process.start()
@@ -254,17 +375,19 @@ def bfs_distributed(root: solver.TreeNode, a_star: bool) -> solver.TreeNode | No
             # Track globally for cleanup
             _all_processes.append((process, stop_event))
             time.sleep(0.05)  # Small delay to stagger startup
+        telemetry.stats.open_size = 0  # Handed to the workers
 
         # Wait for a solution or timeout
-        solution = None
-        timeout = 60  # 1 minute timeout
         start_time = time.time()
 
         while time.time() - start_time < timeout:
             if not solution_queue.empty():
                 try:
-                    solution_data = solution_queue.get(block=False)
-                    solution = pickle.loads(solution_data)
+                    message = solution_queue.get(block=False)
+                    if message[0] == "profile":
+                        reports.append(message[1])
+                        continue
+                    solution = solver.unpack_solution(message[1])
                     stop_event.set()  # Signal all processes to stop
                     break
                 except Exception as e:
@@ -275,6 +398,10 @@ def bfs_distributed(root: solver.TreeNode, a_star: bool) -> solver.TreeNode | No
             if not any(p.is_alive() for p in run_processes):
                 break
 
+            # Stopped from outside, the finally block stops the workers
+            if solver.AsyncSolver._stop:
+                break
+
     finally:
         # Always ensure processes are stopped
         stop_event.set()
@@ -289,11 +416,28 @@ def bfs_distributed(root: solver.TreeNode, a_star: bool) -> solver.TreeNode | No
         # Update global process list
         _all_processes = [(p, e) for p, e in _all_processes if p.is_alive()]
 
+        # Reports of the workers that stopped in time
+        while profiler.enabled():
+            try:
+                message = solution_queue.get(timeout=0.1)
+            except queue.Empty:
+                break
+            if message[0] == "profile":
+                reports.append(message[1])
+        profiler.merge(reports, time.time() - waited_from)
+
+        if shared_visited:
+            visited.close()
+            visited.unlink()
+
     return solution
 
 
 def bfs_single_core(
-    start_node: solver.TreeNode, a_star: bool
+    start_node: solver.TreeNode,
+    a_star: bool,
+    batch_eval=False,
+    tt_memory_mb=TT_MEMORY_MB,
 ) -> solver.TreeNode | None:
     """Single-core BFS implementation that runs in the current process"""
     print("Using single-core BFS")
@@ -309,6 +453,8 @@ def bfs_single_core(
         stop_check_fn=should_stop,
         process_id="single",
         a_star=a_star,
+        batch_eval=batch_eval,
+        visited=TranspositionTable(tt_memory_mb),
     )
 
 
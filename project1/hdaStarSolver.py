@@ -0,0 +1,272 @@
+from heapq import *
+import itertools
+import multiprocessing
+import queue
+import time
+
+import compactBoard as cb
+import deadlockDetector
+import greadyBfsSolver
+import profiler
+import solver
+import telemetry
+
+BATCH_SIZE = 32  # Children sent to another process in one message
+FLUSH_INTERVAL = 16  # Expansions between sending all pending batches
+
+
+def owner(key: int, num_processes: int) -> int:
+    return key % num_processes
+
+
+class HDAStarWorker:
+    """One process of a hash-distributed A* search.
+
+    The process only keeps the states it owns: its part of the global open
+    list and, for every state it has seen, the best cost found and how it was
+    reached. Children owned by other processes are sent to them in batches.
+
+    Termination: counters[0] holds the number of states sent but not yet
+    handled, counters[1] the number of idle processes. The search space is
+    exhausted once every process is idle and no state is in flight.
+    """
+
+    def __init__(self, worker_id, inboxes, result_queue, counters, stop_event, mode):
+        self.id = worker_id
+        self.inboxes = inboxes
+        self.result_queue = result_queue
+        self.counters = counters
+        self.stop_event = stop_event
+        self.mode = mode
+        self.open = []
+        self.closed = dict()  # key -> (cost, parent key, move)
+        self.outboxes = [[] for _ in inboxes]
+        self.idle = True
+        self.expanded = 0
+        self.tie = itertools.count()
+
+    def receive(self, data: bytes, key: int, cost: int, parent, move):
+        """Add a state to the open list, unless it was reached as cheaply before"""
+        seen = self.closed.get(key)
+        if seen is not None and seen[0] <= cost:
+            telemetry.stats.duplicates += 1
+            return
+
+        self.closed[key] = (cost, parent, move)
+        state = cb.CompactBoard(data, self.mode, key)
+        score = solver.heuristic(state) + cost
+        heappush(self.open, (score, next(self.tie), cost, state))
+
+    def send(self, dest: int, item):
+        outbox = self.outboxes[dest]
+        outbox.append(item)
+        if len(outbox) >= BATCH_SIZE:
+            self.flush(dest)
+
+    def flush(self, dest: int):
+        outbox = self.outboxes[dest]
+        if not outbox:
+            return
+        with self.counters.get_lock():
+            self.counters[0] += len(outbox)
+        self.inboxes[dest].put(("batch", outbox))
+        self.outboxes[dest] = []
+
+    def flush_all(self):
+        for dest in range(len(self.outboxes)):
+            self.flush(dest)
+
+    def handle(self, message):
+        if message[0] == "batch":
+            batch = message[1]
+            if not self.stop_event.is_set():
+                for item in batch:
+                    self.receive(*item)
+            with self.counters.get_lock():
+                self.counters[0] -= len(batch)
+                if self.idle:
+                    self.counters[1] -= 1
+            self.idle = False
+        elif message[0] == "trace":
+            self.trace(message[1], message[2])
+
+    def trace(self, key: int, moves: list):
+        """Follow the parent links of a state back to the root.
+
+        Each process adds the moves of the states it owns and hands the trace
+        to the owner of the next parent. The root reports the full path.
+        """
+        while key is not None and owner(key, len(self.inboxes)) == self.id:
+            _, key, move = self.closed[key]
+            if move is not None:
+                moves.append(move)
+        if key is None:
+            self.result_queue.put(("path", moves[::-1]))
+        else:
+            self.inboxes[owner(key, len(self.inboxes))].put(("trace", key, moves))
+
+    def expand(self, cost: int, state: cb.CompactBoard, last_move):
+        move_card = {
+            solver.MoveType.foundation: solver.move_col_foundation,
+            solver.MoveType.column: solver.move_col_col,
+            solver.MoveType.run: solver.move_run,
+        }
+        for move in solver.get_possible_moves(state, last_move):
+            child = move_card[move[0]](state, move[1], move[2])
+            if child is None:
+                continue
+            telemetry.stats.generated += 1
+            if deadlockDetector.is_dead(child, move):
+                telemetry.stats.dead += 1
+                continue
+
+            item = (child.data, child.key, cost + 1, state.key, move)
+            dest = owner(child.key, len(self.inboxes))
+            if dest == self.id:
+                self.receive(*item)
+            else:
+                self.send(dest, item)
+        self.expanded += 1
+        stats = telemetry.stats
+        stats.expanded += 1
+        stats.open_size = len(self.open)
+        stats.depth = cost
+
+    def run(self):
+        inbox = self.inboxes[self.id]
+        telemetry.track(self.open, self.closed)
+        while True:
+            # Take in every state sent so far, waiting for some if idle
+            try:
+                block = not self.open or self.stop_event.is_set()
+                while True:
+                    message = inbox.get(block, 0.05)
+                    if message[0] == "stop":
+                        return
+                    self.handle(message)
+                    block = False
+            except queue.Empty:
+                pass
+
+            if self.stop_event.is_set():
+                continue
+
+            for _ in range(FLUSH_INTERVAL):
+                if not self.open:
+                    break
+                score, _, cost, state = heappop(self.open)
+                if self.closed[state.key][0] < cost:
+                    continue  # Reached more cheaply since it was queued
+
+                h = score - cost
+                if telemetry.stats.best_h is None or h < telemetry.stats.best_h:
+                    telemetry.stats.best_h = h
+
+                if state.is_game_won():
+                    self.result_queue.put(("solution", state.key))
+                    self.stop_event.set()
+                    break
+                self.expand(cost, state, self.closed[state.key][2])
+
+            self.flush_all()
+            if not self.open and not self.idle:
+                self.idle = True
+                with self.counters.get_lock():
+                    self.counters[1] += 1
+
+
+def hda_worker(worker_id, inboxes, result_queue, counters, stop_event, mode):
+    telemetry.start_child()
+    profiler.start_child()
+    worker = HDAStarWorker(worker_id, inboxes, result_queue, counters, stop_event, mode)
+    worker.run()
+    telemetry.stop()
+
+    # States still queued for other processes are dropped, not waited on
+    for inbox in inboxes:
+        inbox.cancel_join_thread()
+    result_queue.put(("expanded", worker.expanded, profiler.child_report()))
+
+
+def hda_star(
+    root: solver.TreeNode, num_processes=None, timeout=60
+) -> tuple[solver.TreeNode | None, int]:
+    """Hash-distributed A*: every state belongs to the process given by its key.
+
+    Unlike bfs_distributed, the processes share one global open list, split
+    between them by owner. Returns the solution node and the number of
+    states expanded.
+    """
+    print("Using hash-distributed A* with multiprocessing")
+    greadyBfsSolver.terminate_all_processes()
+
+    if num_processes is None:
+        num_processes = max(1, multiprocessing.cpu_count() - 1)
+
+    inboxes = [multiprocessing.Queue() for _ in range(num_processes)]
+    result_queue = multiprocessing.Queue()
+    # States in flight (the root to start with) and idle processes
+    counters = multiprocessing.Array("q", [1, num_processes])
+    stop_event = multiprocessing.Event()
+
+    root_state = root.state
+    inboxes[owner(root_state.key, num_processes)].put(
+        ("batch", [(root_state.data, root_state.key, 0, None, None)])
+    )
+
+    processes = []
+    for i in range(num_processes):
+        process = multiprocessing.Process(
+            target=hda_worker,
+            args=(i, inboxes, result_queue, counters, stop_event, root_state.mode),
+        )
+        process.daemon = True
+        process.start()
+        processes.append(process)
+        greadyBfsSolver._all_processes.append((process, stop_event))
+
+    solution = None
+    start_time = time.time()
+    try:
+        while time.time() - start_time < timeout and not solver.AsyncSolver._stop:
+            try:
+                message = result_queue.get(timeout=0.1)
+            except queue.Empty:
+                with counters.get_lock():
+                    if counters[0] == 0 and counters[1] == num_processes:
+                        print("HDA* search space exhausted")
+                        break
+                continue
+
+            if message[0] == "solution":
+                key = message[1]
+                inboxes[owner(key, num_processes)].put(("trace", key, []))
+            elif message[0] == "path":
+                solution = solver.replay_moves(root, message[1])
+                break
+    finally:
+        stop_event.set()
+        for inbox in inboxes:
+            inbox.put(("stop",))
+
+        expanded = 0
+        reports = []
+        while len(reports) < num_processes:
+            try:
+                message = result_queue.get(timeout=1)
+            except queue.Empty:
+                break
+            if message[0] == "expanded":
+                expanded += message[1]
+                reports.append(message[2])
+        profiler.merge(reports, time.time() - start_time)
+
+        for p in processes:
+            p.join(0.5)
+            if p.is_alive():
+                p.terminate()
+        greadyBfsSolver._all_processes = [
+            (p, e) for p, e in greadyBfsSolver._all_processes if p.is_alive()
+        ]
+
+    return solution, expanded
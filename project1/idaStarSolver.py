@@ -2,13 +2,25 @@ import solver
 from heapq import *
 import signal
 import time
+import deadlockDetector
+import telemetry
+from transpositionTable import TranspositionTable
+
+# f = g + WEIGHT * h for the f-cost thresholds. The heuristic already
+# overestimates, so solutions are not optimal either way, and with a weight
+# of 1 the thresholds rise too slowly to solve big deals in a minute.
+WEIGHT = 2
+TABLE_MEMORY_MB = 64  # Cap of the transposition table of FCostIDAStar
+ITERATION_COST = 10**6  # More than any path length, see FCostIDAStar.cost
 
 
 class IDAStar:
-    def __init__(self, board):
+    def __init__(self, board, in_place=False, batch_eval=False):
         self.visited_states = set()
         self.height = 10
         self.root = solver.TreeNode(board)
+        self.in_place = in_place
+        self.batch_eval = batch_eval
         self._stop_flag = False
 
     def set_stop_flag(self):
@@ -23,8 +35,9 @@ class IDAStar:
         move_card = {
             solver.MoveType.foundation: solver.move_col_foundation,
             solver.MoveType.column: solver.move_col_col,
+            solver.MoveType.run: solver.move_run,
         }
-        self.visited_states.add(hash(root.state))
+        self.visited_states.add(root.state.key)
         pq = []
 
         if root.state.is_game_won():
@@ -37,7 +50,12 @@ class IDAStar:
         if self.should_stop():
             return []
 
-        moves = solver.get_possible_moves(root.state)
+        moves = solver.get_possible_moves(root.state, root.move)
+        children = []
+        stats = telemetry.stats
+        stats.depth = depth
+        if stats.best_h is None or root.score < stats.best_h:
+            stats.best_h = root.score
 
         for move in moves:
             # Check if we should stop
@@ -45,11 +63,22 @@ class IDAStar:
                 return []
 
             state = move_card[move[0]](root.state, move[1], move[2])
+            if state is None:
+                continue
+            stats.generated += 1
+
+            if state.key in self.visited_states:
+                stats.duplicates += 1
+            elif deadlockDetector.is_dead(state, move):
+                stats.dead += 1
+            else:
+                children.append((state, move))
+        stats.expanded += 1
 
-            if state is not None and hash(state) not in self.visited_states:
-                node = solver.TreeNode(state)
-                root.add_child(node, move)
-                heappush(pq, node)
+        for (state, move), score in zip(children, self.scores(children, root)):
+            node = solver.TreeNode(state, score=score)
+            root.add_child(node, move)
+            heappush(pq, node)
 
         while pq and not self.should_stop():
             node = heappop(pq)
@@ -61,19 +90,126 @@ class IDAStar:
 
         return leaves
 
+    def dfs_in_place(self, root: solver.TreeNode) -> list[solver.TreeNode]:
+        """Same expansion as dfs, but plays and takes back moves on one board.
+
+        TreeNodes are only built for the paths that lead to a returned leaf.
+        """
+        state = root.state.mutable_copy()
+        self.visited_states.add(state.key)
+
+        if state.is_game_won():
+            return [root]
+
+        leaves = []
+        path = []
+        nodes = [root]  # TreeNodes built so far for the start of path
+        stack = [self.ordered_moves(state, root.move)]
+
+        while stack and not self.should_stop():
+            moves = stack[-1]
+            if not moves:
+                stack.pop()
+                if path:
+                    solver.undo_move(state, path.pop())
+                    del nodes[len(path) + 1 :]
+                continue
+
+            move = moves.pop()
+            solver.apply_move(state, move)
+            if state.key in self.visited_states:
+                solver.undo_move(state, move)
+                continue
+
+            self.visited_states.add(state.key)
+            path.append(move)
+            telemetry.stats.depth = len(path)
+
+            if state.is_game_won() or len(path) == self.height:
+                leaves.append(self.build_nodes(state, path, nodes))
+                path.pop()
+                del nodes[len(path) + 1 :]
+                solver.undo_move(state, move)
+            else:
+                stack.append(self.ordered_moves(state, move))
+
+        return leaves
+
+    def ordered_moves(self, state, last_move=None) -> list[tuple[str, int, int]]:
+        """Moves to unvisited children, best scored last so pop() takes it first"""
+        boards, moves, scores = [], [], []
+        stats = telemetry.stats
+        for move in solver.get_possible_moves(state, last_move):
+            solver.apply_move(state, move)
+            stats.generated += 1
+            if state.key in self.visited_states:
+                stats.duplicates += 1
+            elif deadlockDetector.is_dead(state, move):
+                stats.dead += 1
+            else:
+                moves.append(move)
+                if self.batch_eval:
+                    boards.append(state.frozen_copy())
+                else:
+                    scores.append(self.root.evaluate(state))
+            solver.undo_move(state, move)
+
+        if self.batch_eval and boards:
+            scores = solver.TreeNode.evaluate_batch(boards, self.root)
+        stats.expanded += 1
+        if scores and (stats.best_h is None or min(scores) < stats.best_h):
+            stats.best_h = min(scores)
+
+        scored = sorted(zip(scores, moves), reverse=True)
+        return [move for _, move in scored]
+
+    def scores(self, children, parent) -> list[float | None]:
+        """Scores of (board, move) children, None to let each node evaluate itself"""
+        if self.batch_eval and children:
+            return solver.TreeNode.evaluate_batch(
+                [board for board, _ in children], parent
+            )
+        return [None] * len(children)
+
+    def build_nodes(self, state, path, nodes) -> solver.TreeNode:
+        """Build the TreeNodes missing from nodes for path, returning the last.
+
+        The boards of the missing nodes are recovered by taking back moves,
+        then the moves are played again to leave state unchanged.
+        """
+        missing = path[len(nodes) - 1 :]
+        boards = []
+        for move in reversed(missing):
+            boards.append(state.frozen_copy())
+            solver.undo_move(state, move)
+
+        for move, board in zip(missing, reversed(boards)):
+            solver.apply_move(state, move)
+            node = solver.TreeNode(board)
+            nodes[-1].add_child(node, move)
+            nodes.append(node)
+
+        return nodes[-1]
+
+    def expand(self, node: solver.TreeNode) -> list[solver.TreeNode]:
+        return self.dfs_in_place(node) if self.in_place else self.dfs(node, 0)
+
     def runIDAS(self):
         """Run IDA* search with periodic checks to stop if requested"""
-        queue = self.dfs(self.root, 0)
+        telemetry.track(None, self.visited_states)
+        queue = self.expand(self.root)
         heapify(queue)
+        telemetry.track(queue, self.visited_states)
 
         iterations = 0
         while queue and not self.should_stop():
             current_state = heappop(queue)
+            telemetry.stats.open_size = len(queue)
 
             if current_state.state.is_game_won():
                 return current_state
 
-            for leaf in self.dfs(current_state, 0):
+            for leaf in self.expand(current_state):
                 heappush(queue, leaf)
 
             iterations += 1
@@ -84,9 +220,143 @@ class IDAStar:
         return None
 
 
+class FCostIDAStar:
+    """IDA* on f = g + h thresholds, keeping only the current path in memory.
+
+    Each iteration is a depth-first search that plays and takes back moves
+    on one board, cutting off the states whose f is over the threshold; the
+    next iteration raises the threshold to the lowest f that was cut off.
+    States reached again at no lower cost in the same iteration are dropped
+    using a TranspositionTable, whose memory cap bounds the whole search.
+    """
+
+    def __init__(self, board, weight=WEIGHT, max_memory_mb=TABLE_MEMORY_MB):
+        self.board = board
+        self.weight = weight
+        self.table = TranspositionTable(max_memory_mb)
+        self.iteration = 0
+        self.states_processed = 0
+        self._stop_flag = False
+
+    def set_stop_flag(self):
+        self._stop_flag = True
+
+    def should_stop(self):
+        return self._stop_flag or solver.AsyncSolver._stop
+
+    def estimate(self, state) -> int:
+        """Heuristic without its random tie break, so thresholds rise by whole moves"""
+        return int(solver.heuristic(state))
+
+    def cost(self, g: int) -> int:
+        """Table cost of reaching a state after g moves in this iteration.
+
+        Entries of earlier iterations always cost more, so states are only
+        dropped when they were already reached in the current iteration.
+        """
+        return g - self.iteration * ITERATION_COST
+
+    def successors(self, state, g: int, threshold: float, path_keys: set, last_move):
+        """Moves worth trying from state, best last so pop() takes it first.
+
+        Also returns the lowest f over threshold among the children, and
+        whether a move wins, in which case it is the only one returned.
+        """
+        scored = []
+        cut_off = float("inf")
+        stats = telemetry.stats
+        for move in solver.get_possible_moves(state, last_move):
+            solver.apply_move(state, move)
+            stats.generated += 1
+            if state.is_game_won():
+                solver.undo_move(state, move)
+                return [move], cut_off, True
+
+            key = state.key
+            if key in path_keys or not self.table.visit(
+                key, self.cost(g + 1), reopen=True
+            ):
+                stats.duplicates += 1
+            elif deadlockDetector.is_dead(state, move):
+                stats.dead += 1
+            else:
+                h = self.estimate(state)
+                f = g + 1 + self.weight * h
+                if f <= threshold:
+                    scored.append((h, move))
+                    if stats.best_h is None or h < stats.best_h:
+                        stats.best_h = h
+                elif f < cut_off:
+                    cut_off = f
+            solver.undo_move(state, move)
+
+        stats.expanded += 1
+        self.states_processed += 1
+        scored.sort(reverse=True)
+        return [move for _, move in scored], cut_off, False
+
+    def search(self, threshold: float):
+        """One depth-first iteration, returning the winning moves if found
+        and the threshold of the next iteration.
+        """
+        state = self.board.mutable_copy()
+        path = []
+        path_keys = {state.key}
+        self.table.visit(state.key, self.cost(0), reopen=True)
+        moves, next_threshold, won = self.successors(
+            state, 0, threshold, path_keys, None
+        )
+        stack = [moves]
+        stats = telemetry.stats
+
+        while stack and not won and not self.should_stop():
+            moves = stack[-1]
+            if not moves:
+                stack.pop()
+                if path:
+                    path_keys.discard(state.key)
+                    solver.undo_move(state, path.pop())
+                continue
+
+            move = moves.pop()
+            solver.apply_move(state, move)
+            path.append(move)
+            path_keys.add(state.key)
+            stats.depth = len(path)
+            stats.open_size = len(path)
+
+            moves, cut_off, won = self.successors(
+                state, len(path), threshold, path_keys, move
+            )
+            next_threshold = min(next_threshold, cut_off)
+            stack.append(moves)
+
+        if won:
+            return path + stack[-1], next_threshold
+        return None, next_threshold
+
+    def run(self) -> solver.TreeNode | None:
+        """Search with rising thresholds until solved, stopped or out of moves"""
+        root = solver.TreeNode(self.board)
+        if self.board.is_game_won():
+            return root
+        telemetry.track(None, self.table)
+
+        threshold = self.weight * self.estimate(self.board)
+        while not self.should_stop():
+            moves, threshold = self.search(threshold)
+            if moves is not None:
+                return solver.replay_moves(root, moves)
+            if threshold == float("inf"):
+                return None  # Every state was cut off by the table or a dead end
+            self.iteration += 1
+            print(f"IDA* threshold raised to {threshold}")
+        return None
+
+
 # This function is used by the AsyncSolver to run IDA*
-def run_idastar(board):
-    ida = IDAStar(board)
+def run_idastar(board, in_place=False, batch_eval=False):
+    ida = IDAStar(board, in_place, batch_eval)
 
     def signal_handler(*args):
         ida.set_stop_flag()
@@ -94,3 +364,15 @@ def run_idastar(board):
     signal.signal(signal.SIGTERM, signal_handler)
 
     return ida.runIDAS()
+
+
+def run_fcost_idastar(board):
+    """FCostIDAStar search, returning the solution and the states expanded"""
+    ida = FCostIDAStar(board)
+
+    def signal_handler(*args):
+        ida.set_stop_flag()
+
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    return ida.run(), ida.states_processed
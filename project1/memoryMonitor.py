@@ -0,0 +1,146 @@
+import gc
+import sys
+import threading
+import time
+
+import psutil
+
+MIN_INTERVAL = 0.005  # Seconds between samples at the start of a solve
+MAX_INTERVAL = 0.5
+SAMPLES = 50  # Samples to aim for over the time elapsed so far
+MAX_OVERHEAD = 0.05  # Share of one core the sampling may use
+
+
+def process_memory(process: psutil.Process) -> int:
+    """Proportional set size of a process, or its RSS where PSS is unknown.
+
+    Forked search workers share most of their pages with their parent, so
+    adding up RSS counts those pages once per process.
+    """
+    try:
+        info = process.memory_full_info()
+        return getattr(info, "pss", info.rss)
+    except psutil.AccessDenied:
+        return process.memory_info().rss
+
+
+def tree_memory(pids: list[int]) -> int:
+    """Memory of some processes and all of their children, in bytes"""
+    processes = dict()
+    for pid in pids:
+        try:
+            process = psutil.Process(pid)
+            processes[pid] = process
+            for child in process.children(recursive=True):
+                processes[child.pid] = child
+        except psutil.NoSuchProcess:
+            pass
+
+    total = 0
+    for process in processes.values():
+        try:
+            total += process_memory(process)
+        except psutil.NoSuchProcess:
+            pass
+    return total
+
+
+class MemoryMonitor:
+    """Samples the memory of a process tree from a thread until stopped.
+
+    Samples are taken every MIN_INTERVAL at first, so short solves still get
+    their peak measured, then spread out as the solve goes on, and never so
+    often that sampling takes more than MAX_OVERHEAD of a core.
+    """
+
+    def __init__(self, pids: list[int]):
+        self.pids = pids
+        self.peak = 0
+        self.last = 0
+        self.samples = 0
+        self.weighted_sum = 0  # Memory x seconds, for the average
+        self.duration = 0
+        self.finished = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.finished.set()
+
+    def average(self) -> float:
+        """Average over time, not over samples, as the sampling rate varies"""
+        return self.weighted_sum / self.duration if self.duration else self.last
+
+    def run(self):
+        start = time.perf_counter()
+        interval = MIN_INTERVAL
+        previous = start
+        while True:
+            # CPU time of this thread, as the solver processes can keep it
+            # waiting for a core far longer than the sample takes
+            sample_start = time.thread_time()
+            memory = tree_memory(self.pids)
+            cost = time.thread_time() - sample_start
+            now = time.perf_counter()
+
+            if memory:
+                if self.samples:
+                    self.weighted_sum += self.last * (now - previous)
+                    self.duration += now - previous
+                self.peak = max(self.peak, memory)
+                self.last = memory
+                self.samples += 1
+                previous = now
+
+            interval = min(
+                MAX_INTERVAL,
+                max(
+                    MIN_INTERVAL,
+                    (now - start) / SAMPLES,
+                    cost / MAX_OVERHEAD,
+                ),
+            )
+            if self.finished.wait(interval):
+                return
+
+
+def structure_bytes(structure) -> int:
+    """Estimated memory of a search structure and of the objects in it.
+
+    Transposition tables report their own size. For other containers the
+    size of one element is measured and taken to hold for all of them.
+    """
+    if structure is None:
+        return 0
+    if hasattr(structure, "nbytes"):
+        return structure.nbytes()
+
+    size = sys.getsizeof(structure)
+    if not structure:
+        return size
+    if isinstance(structure, dict):
+        key, value = next(iter(structure.items()))
+        return size + len(structure) * (sys.getsizeof(key) + sys.getsizeof(value))
+    sample = next(iter(structure))
+    return size + len(structure) * object_bytes(sample)
+
+
+def object_bytes(obj) -> int:
+    """Size of a search node or board with the board it holds"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, tuple):
+        return size + sum(object_bytes(item) for item in obj)
+    state = getattr(obj, "state", None)
+    if state is not None:
+        size += object_bytes(state)
+    data = getattr(obj, "data", None)
+    if isinstance(data, bytes):
+        size += sys.getsizeof(data)
+    return size
+
+
+def count_instances(cls) -> int:
+    """Live instances of a class and its subclasses (walks the whole heap)"""
+    return sum(1 for obj in gc.get_objects() if isinstance(obj, cls))
@@ -0,0 +1,159 @@
+import importlib
+import time
+
+# Phases of a search and the functions timed for each. Functions are looked
+# up by module (or class) and name, as the searches call them through their
+# modules; enable() swaps in timed versions and disable() puts them back, so
+# nothing is timed, or slowed down, while profiling is off.
+PHASES = {
+    "move_generation": [("solver", "get_possible_moves")],
+    "board_copy": [
+        ("solver", "move_col_col"),
+        ("solver", "move_col_foundation"),
+        ("solver", "move_run"),
+        ("solver", "apply_move"),
+        ("solver", "undo_move"),
+    ],
+    # Boards compute their key as they are made, so hashing here is looking
+    # states up in the transposition tables. Lookups in plain sets (DFS, BFS,
+    # IDA*) are too cheap to time this way and are left out.
+    "hashing": [
+        ("transpositionTable.TranspositionTable", "visit"),
+        ("transpositionTable.TranspositionTable", "get"),
+        ("transpositionTable.SharedTranspositionTable", "visit"),
+        ("transpositionTable.SharedTranspositionTable", "get"),
+    ],
+    "evaluate": [("solver", "heuristic"), ("batchHeuristic", "evaluate")],
+    "heap": [
+        (module, name)
+        for module in ("greadyBfsSolver", "idaStarSolver", "hdaStarSolver")
+        for name in ("heappush", "heappop", "heapify")
+    ],
+}
+
+times = dict.fromkeys(PHASES, 0.0)
+calls = dict.fromkeys(PHASES, 0)
+_originals = []  # (owner, name, function) replaced by enable
+_start = None
+_merged = dict()  # Summed reports of worker processes, see merge
+_inside = False  # In a timed call, whose time already covers any nested one
+
+
+def timed(phase: str, fn):
+    perf_counter = time.perf_counter
+
+    def wrapper(*args, **kwargs):
+        global _inside
+        if _inside:
+            return fn(*args, **kwargs)
+        _inside = True
+        start = perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            times[phase] += perf_counter() - start
+            calls[phase] += 1
+            _inside = False
+
+    return wrapper
+
+
+def resolve(path: str):
+    """Module or class from a dotted path like transpositionTable.TranspositionTable"""
+    module, _, cls = path.partition(".")
+    owner = importlib.import_module(module)
+    return getattr(owner, cls) if cls else owner
+
+
+def enable():
+    """Start timing the phases of the searches run in this process"""
+    global _start
+    if _originals:
+        return
+    _merged.clear()
+    for phase in PHASES:
+        times[phase] = 0.0
+        calls[phase] = 0
+        for path, name in PHASES[phase]:
+            try:
+                owner = resolve(path)
+            except ImportError:
+                continue  # batchHeuristic without NumPy
+            fn = owner.__dict__.get(name)
+            if fn is None:
+                continue
+            _originals.append((owner, name, fn))
+            setattr(owner, name, timed(phase, fn))
+    _start = time.perf_counter()
+
+
+def disable():
+    for owner, name, fn in reversed(_originals):
+        setattr(owner, name, fn)
+    _originals.clear()
+
+
+def enabled() -> bool:
+    return bool(_originals)
+
+
+def start_child():
+    """Time a forked search worker from scratch if its parent was profiling.
+
+    The worker inherits the timed functions along with the parent's times,
+    which the parent reports itself.
+    """
+    global _start
+    if not _originals:
+        return
+    _merged.clear()
+    for phase in PHASES:
+        times[phase] = 0.0
+        calls[phase] = 0
+    _start = time.perf_counter()
+
+
+def child_report() -> dict | None:
+    """report() for a worker to send back with its result, None if not profiling"""
+    return report() if _originals else None
+
+
+def combine(reports: list[dict]) -> dict:
+    """One report from those of several processes, times and calls summed"""
+    combined = dict()
+    for r in reports:
+        for name, value in r.items():
+            combined[name] = combined.get(name, 0) + value
+    return combined
+
+
+def merge(reports: list[dict | None], waited=0.0):
+    """Add the reports of worker processes to the report of this one.
+
+    waited is the time this process spent waiting on the workers. It is left
+    out of other_s, as the workers' own times stand in for it.
+    """
+    reports = [r for r in reports if r is not None]
+    if not reports:
+        return
+    combined = combine([_merged, *reports])
+    combined["other_s"] = combined["other_s"] - waited
+    _merged.clear()
+    _merged.update(combined)
+
+
+def report() -> dict:
+    """Seconds and calls per phase since enable, and the time outside them.
+
+    Includes the reports of the worker processes merged in since.
+    """
+    result = dict()
+    for phase in PHASES:
+        result[f"{phase}_s"] = times[phase]
+        result[f"{phase}_calls"] = calls[phase]
+    total = time.perf_counter() - _start if _start is not None else 0
+    result["other_s"] = total - sum(times.values())
+    if _merged:
+        result = combine([result, _merged])
+    result["other_s"] = max(0.0, result["other_s"])
+    return result
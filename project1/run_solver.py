@@ -33,6 +33,12 @@ def write_to_csv(results: dict, filename="solver_results.csv"):
 def solver_worker(dummy_arg=None):
     controller = importlib.import_module("controller")
     Solver = importlib.import_module("solver")
+    cb = importlib.import_module("compactBoard")
+    solvability = importlib.import_module("solvability")
+    # Solver processes kept for the whole run. Each benchmark process already
+    # has a core of its own, so one worker is enough for the single-core types.
+    pool = importlib.import_module("solverPool").SolverPool(num_workers=1)
+    pool.start()
 
     for solver_type in SolverTypes:
         for _ in range(Times // (multiprocessing.cpu_count() - 1)):
@@ -40,11 +46,26 @@ def solver_worker(dummy_arg=None):
             board = controller.BoardController()
             seed = board.get_seed()
 
-            solver = Solver.AsyncSolver(board, solver_type)
+            # Deals the pre-check proves unsolvable do not take up a solve and
+            # are recorded apart. The others are solved without it, so the
+            # results are those of the solver alone.
+            verdict, _ = solvability.check(cb.CompactBoard.from_board(board.model))
+            if verdict == solvability.UNSOLVABLE:
+                print(f"Deal {seed.hex()} can not be won, not solved")
+                write_to_csv(
+                    {
+                        "solver_type": solver_type,
+                        "seed": seed.hex(),
+                        "verdict": verdict,
+                    },
+                    "precheck_results.csv",
+                )
+                continue
+
+            solver = Solver.AsyncSolver(board, solver_type, pool=pool)
             solver.start()
 
-            while solver.is_running():
-                continue  # Wait for the solver to find the solution
+            solver.wait()  # Sleeps until the solver ends
 
             if not solver.has_solution():
                 print("Solution not found")
@@ -61,6 +82,7 @@ def solver_worker(dummy_arg=None):
                 "states_processed": solver.get_states_processed(),
                 "moves": solver.get_moves(),
                 "seed": seed.hex(),
+                "verdict": verdict,
             }
 
             del board
@@ -73,6 +95,8 @@ def solver_worker(dummy_arg=None):
                 print(f"{key}: {results[key]}")
             print()
 
+    pool.shutdown()
+
 
 def main():
 
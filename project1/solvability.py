@@ -0,0 +1,64 @@
+from heapq import *
+
+import compactBoard as cb
+import deadlockDetector
+import solver
+
+SOLVABLE = "solvable"
+UNSOLVABLE = "unsolvable"
+UNKNOWN = "unknown"
+
+MAX_STATES = 2000  # Expansions of the bounded search, a fraction of a second
+
+
+def search(root: cb.CompactBoard, max_states=MAX_STATES):
+    """Greedy best-first search of at most max_states expansions.
+
+    Returns SOLVABLE and the solution node if it finds one, UNSOLVABLE if
+    every board reachable from root was seen, UNKNOWN otherwise. Only rules
+    that keep a winnable board winnable cut the search: safe moves, and
+    the boards deadlockDetector proves dead. Move orders are not reduced
+    (see get_possible_moves), as a board first seen on a reduced path would
+    never be tried with the other moves.
+    """
+    move_card = {
+        solver.MoveType.foundation: solver.move_col_foundation,
+        solver.MoveType.column: solver.move_col_col,
+        solver.MoveType.run: solver.move_run,
+    }
+    open_list = [solver.TreeNode(root)]
+    seen = {root.key}
+    for _ in range(max_states):
+        if not open_list:
+            return UNSOLVABLE, None
+        if solver.AsyncSolver._stop:
+            break
+
+        node = heappop(open_list)
+        if node.state.is_game_won():
+            return SOLVABLE, node
+        for move in solver.get_possible_moves(node.state):
+            state = move_card[move[0]](node.state, move[1], move[2])
+            if state is None or state.key in seen:
+                continue
+            seen.add(state.key)
+            if deadlockDetector.is_dead(state, move):
+                continue
+            child = solver.TreeNode(state, node)
+            node.add_child(child, move)
+            heappush(open_list, child)
+
+    return (UNKNOWN if open_list else UNSOLVABLE), None
+
+
+def check(state: cb.CompactBoard, max_states=MAX_STATES):
+    """Classify a board as SOLVABLE, UNSOLVABLE or UNKNOWN before solving it.
+
+    The deadlock rules (see deadlockDetector) rule out boards that can not
+    be won even if every card that is not stuck could be taken away, then
+    a bounded search either finds a solution or runs out of boards to try.
+    Returns the verdict and the solution node of a SOLVABLE board.
+    """
+    if deadlockDetector.start(state):
+        return UNSOLVABLE, None
+    return search(state, max_states)
@@ -1,91 +1,113 @@
 import pickle
+import queue
 import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 import cards as c
-from controller import BoardController
 from heapq import *
 import random
 import importlib
 import multiprocessing
 import signal
 import time
-import psutil
 
 from typing import TYPE_CHECKING
 
+if TYPE_CHECKING:
+    from controller import BoardController
+
 import board as b
+import compactBoard as cb
+import deadlockDetector
+import memoryMonitor
+import profiler
+import telemetry
+
+
+def heuristic(state: cb.CompactBoard) -> float:
+    """Estimate of how far a board is from being solved, lower is better"""
+    cost = AsyncSolver.learn.get(state.key)
+    if cost != None:
+        return -(10**3) // (cost + 1)
+
+    score = 0
+    # Value each suit needs next on its foundation (Ace if not started)
+    nextValues = [c.CardValue.ace] * 4
+    sumLen = 0
+    for top in state.foundation_tops():
+        if top != cb.EMPTY:
+            nextValues[top % 4] = top // 4 + 2
+            sumLen += top // 4 + 1
+
+    for cards in state.columns():
+        above = len(cards)
+
+        for card in cards:
+            above -= 1
+            diff = card // 4 + 1 - nextValues[card % 4]
+            if diff < above:
+                score += above - diff
+
+    score += 13 * 4 - sumLen
+
+    return score + random.random()
 
 
 class TreeNode:
-    def evaluate(self, state: b.Board) -> float:
-        cost = AsyncSolver.learn.get(hash(state))
-        if cost != None:
-            return -(10**3) // (cost + 1)
-
-        score = 0
-        nextCards = {
-            (found.get_suite().value): (found.next()) for found in state.foundations
-        }
-
-        lenFounds = [len(found.cards) for found in state.foundations]
-        sumLen = sum(lenFounds)
-
-        for column in state.columns:
-            cards = column.cards
-
-            for i, card in enumerate(cards):
-                nextCard = nextCards.get(card.cardSuite.value)
-                if nextCard is None:
-                    nextCard = nextCards.get(c.CardSuite.any)
-                if card.cardValue.value - nextCard.cardValue.value < (
-                    len(cards) - i - 1
-                ):
-                    score += (
-                        len(cards)
-                        - i
-                        - 1
-                        - (card.cardValue.value - nextCard.cardValue.value)
-                    )
-
-        score += 13 * 4 - sumLen
-
-        return score + random.random()
-
-    def __init__(self, state: b.Board, parent=None):
+    """Search node: a board, the move that reached it and its scores.
+
+    Nodes only point up to their parent, so a node is freed as soon as it
+    has left the open list and none of its descendants are kept.
+    """
+
+    __slots__ = ("state", "parent", "move", "next", "actualCost", "score")
+
+    def evaluate(self, state: cb.CompactBoard) -> float:
+        return heuristic(state)
+
+    @classmethod
+    def evaluate_batch(cls, states: list[cb.CompactBoard], parent) -> list[float]:
+        """Scores of children of parent, same as building a node for each."""
+        batchHeuristic = importlib.import_module("batchHeuristic")
+        return batchHeuristic.evaluate(states)
+
+    def __init__(self, state: cb.CompactBoard, parent=None, score=None):
         self.state = state
         self.parent = parent
-        self.children = dict()
+        self.move = None  # Move from parent to this node, set by add_child
         self.next = None
         self.actualCost = self.parent.actualCost + 1 if self.parent is not None else 0
-        self.score = self.evaluate(state)
+        self.score = self.evaluate(state) if score is None else score
 
     def add_child(self, child_node: "TreeNode", transition: tuple[str, int, int]):
-        self.children[child_node] = transition
         child_node.parent = self
+        child_node.move = transition
 
     def __lt__(self, other):
         return isinstance(other, TreeNode) and self.score < other.score
 
 
-def execute_next_move(root: TreeNode, board: BoardController):
+def execute_next_move(root: TreeNode, board: "BoardController"):
     if root.next != None:
         next, move = root.next
 
-        if move[0] == MoveType.column:
-            board.move_card_column_column(
-                board.columns[move[1]], board.columns[move[2]]
-            )
-        elif move[0] == MoveType.foundation:
-            board.move_card_column_foundation(
-                board.columns[move[1]], board.foundations[move[2]]
-            )
+        # link_solution splits runs, but play any left one card at a time
+        for move in run_steps(move):
+            if move[0] == MoveType.column:
+                board.move_card_column_column(
+                    board.columns[move[1]], board.columns[move[2]]
+                )
+            elif move[0] == MoveType.foundation:
+                board.move_card_column_foundation(
+                    board.columns[move[1]], board.foundations[move[2]]
+                )
 
         return next
     return None
 
 
-def get_next_move(root: TreeNode, board: BoardController):
+def get_next_move(root: TreeNode, board: "BoardController"):
     if root.next != None:
-        move = root.next[1]
+        move = run_steps(root.next[1])[0]
 
     return board.columns[move[1]].top()
 
@@ -109,8 +131,33 @@ class AsyncSolver:
     learn = load_data_pickle("learn.data")
     _stop = False
 
-    def __init__(self, game_board, solver_type="gready-multi-core"):
-        self.initstate = game_board.model
+    def __init__(
+        self,
+        game_board,
+        solver_type="gready-multi-core",
+        batch_eval=False,
+        pool=None,
+        random_seed=None,
+        telemetry_interval=None,
+        on_telemetry=None,
+        memory_breakdown=False,
+        profile=False,
+        precheck=False,
+        timeout=None,
+    ):
+        # The game's BoardController, or a plain board.Board
+        if not isinstance(game_board, b.Board):
+            game_board = game_board.model
+        self.initstate = cb.CompactBoard.from_board(game_board)
+        # Seconds the multi-core and pool solves wait on their workers, None
+        # for the solvers' own limits (see run_search and SolverPool.solve)
+        self.timeout = timeout
+        self.batch_eval = batch_eval  # Score children with batchHeuristic
+        self.pool = pool  # solverPool.SolverPool to run on, if any
+        self.token = None  # Cancellation token of the solve on the pool
+        # Seed of the heuristic's tie breaks in the solver process. Forked
+        # processes reseed random, so it has to be set there.
+        self.random_seed = random_seed
         self.solution = None
         self.process = None
         self.running = False
@@ -118,10 +165,39 @@ class AsyncSolver:
         self.solver_type = solver_type.lower()  # 'bfs' or 'idastar'
         self.start_time = 0
         self.stop_time = 0
-        self.maxMemUsed = 0
-        self.sumMemUsed = 0
-        self.measuresMemUsed = 0
+        self.memory = None  # memoryMonitor.MemoryMonitor of the solver processes
         self.states_processed = 0
+        # Resolved with the solution (or None) once the solve ends
+        self.future = Future()
+        # Search telemetry (see telemetry.merge), sampled every interval
+        # seconds when set. Samples go to on_telemetry(sample), which stops
+        # the solve by returning True, or else to the telemetry queue.
+        # memory_breakdown adds the memory of each search structure to them.
+        if (
+            on_telemetry is not None or memory_breakdown
+        ) and telemetry_interval is None:
+            telemetry_interval = telemetry.INTERVAL
+        self.telemetry_interval = telemetry_interval
+        self.memory_breakdown = memory_breakdown
+        self.on_telemetry = on_telemetry
+        self.telemetry = queue.Queue()
+        self.last_telemetry = None
+        self.telemetry_channel = None  # From the solver process to this one
+        # Time per search phase (see profiler.report), summed over the
+        # processes of the solve
+        self.profile = profile
+        self.profile_report = None
+        # Classify the deal first (see solvability.check), and only run the
+        # solver on deals the pre-check could not settle
+        self.precheck = precheck
+        self.verdict = None
+        # Solvers like anytime publish better and better solutions while
+        # they run; a solution is only replaced as long as none of it was
+        # played (see _publish)
+        self.published = None  # Root of the last solution published
+        self.published_moves = 0
+        self.solution_lock = threading.Lock()
+        self.solution_callbacks = []
 
     def get_moves(self):
         count = 0
@@ -131,6 +207,8 @@ class AsyncSolver:
 
     def stop(self):
         AsyncSolver._stop = True
+        if self.token is not None:
+            self.pool.cancel(self.token)
         if self.process and self.process.is_alive():
             self.process.terminate()
 
@@ -138,10 +216,11 @@ class AsyncSolver:
         return self.states_processed
 
     def get_max_mem_used(self):
-        return self.maxMemUsed
+        """Peak memory (PSS) of the solver processes and their children"""
+        return self.memory.peak if self.memory is not None else 0
 
     def get_avg_mem_used(self):
-        return self.sumMemUsed / self.measuresMemUsed if self.measuresMemUsed else 0
+        return self.memory.average() if self.memory is not None else 0
 
     def get_time_elapsed(self):
         return self.stop_time - self.start_time
@@ -149,65 +228,124 @@ class AsyncSolver:
     def save_data(self):
         save_data_pickle("learn.data", self.learn)
 
+    def _precheck(self, initstate) -> tuple[TreeNode | None, bool]:
+        """Run the pre-check, if enabled, setting verdict.
+
+        Returns its solution, if any, and whether it settled the deal so
+        that the solver need not run. The anytime solver still runs on a
+        solvable deal, to find a shorter solution.
+        """
+        if not self.precheck:
+            return None, False
+        solvability = importlib.import_module("solvability")
+        self.verdict, solution = solvability.check(initstate)
+        print(f"Pre-check found the deal {self.verdict}")
+        if self.solver_type == "anytime":
+            return solution, self.verdict == solvability.UNSOLVABLE
+        return solution, self.verdict != solvability.UNKNOWN
+
     def _run_solver_process(self, initstate, result_queue):
         """Execute selected solver in a separate process and put result in queue"""
         AsyncSolver._stop = False
+        if self.random_seed is not None:
+            random.seed(self.random_seed)
         print(f"AI process running using {self.solver_type.upper()} solver")
-        v = TreeNode(initstate)
+        if self.telemetry_interval is not None:
+            telemetry.start(
+                self.telemetry_channel,
+                None,
+                self.telemetry_interval,
+                self.memory_breakdown,
+            )
+
+        if self.profile:
+            profiler.enable()
+
+        def on_solution(solution):
+            result_queue.put(pickle.dumps(("solution", pack_solution(solution))))
 
-        solution = None
         self.start_time = time.time_ns()
-        if (
-            self.solver_type == "gready-multi-core"
-            or self.solver_type == "a*-multi-core"
-        ):
-            bfsSolver = importlib.import_module("greadyBfsSolver")
-            signal.signal(signal.SIGTERM, bfsSolver.kill_all)
-            solution = bfsSolver.bfs_distributed(v, self.solver_type == "a*-multi-core")
-        elif self.solver_type == "idastar":
-            idastar = importlib.import_module("idaStarSolver")
-            ida = idastar.IDAStar(initstate)
-            solution = ida.runIDAS()
-        elif (
-            self.solver_type == "gready-single-core"
-            or self.solver_type == "a*-single-core"
-        ):
-            bfsSolver = importlib.import_module("bfsSolver")
-            solution, self.states_processed = bfsSolver.bfs_single_core(
-                v, self.solver_type == "a*-single-core"
+        solution, settled = self._precheck(initstate)
+        if not settled:
+            if solution:
+                on_solution(solution)  # Until the solver finds a shorter one
+            solution, self.states_processed = run_search(
+                initstate, self.solver_type, self.batch_eval, on_solution, self.timeout
             )
-        elif self.solver_type == "dfs":
-            dfsSolver = importlib.import_module("dfsSolver")
-            solution = dfsSolver.run_dfs(initstate)
-        elif self.solver_type == "bfs":
-            bfsSolver = importlib.import_module("bfsSolver")
-            solution = bfsSolver.run_bfs(v)
         self.stop_time = time.time_ns()
-        v = solution
+        telemetry.stop()
+        profile_report = profiler.report() if self.profile else None
+        profiler.disable()
+        packed = None
         if solution:
             print(f"{self.solver_type.upper()} solver found solution")
-            # Process the solution to create next moves
-            depth = 0
-            v = solution
-            while v.parent is not None:
-                data = AsyncSolver.learn.get(hash(v.state))
-                if data is None or depth < data:
-                    AsyncSolver.learn[hash(v.state)] = depth
-                depth += 1
-                parent = v.parent
-                parent.next = (v, parent.children[v])
-                v = parent
-
-            # Put the initial solution node in queue along with timing information
+            packed = pack_solution(solution)
 
+        # Put the packed solution in queue along with timing information
         result_queue.put(
-            pickle.dumps((v, self.start_time, self.stop_time, self.states_processed))
+            pickle.dumps(
+                (
+                    packed,
+                    self.start_time,
+                    self.stop_time,
+                    self.states_processed,
+                    profile_report,
+                    self.verdict,
+                )
+            )
         )
 
+    def _run_pool_solve(self):
+        """Run the solve on the pool and wait for its result"""
+        try:
+            self.start_time = time.time_ns()
+            solution, settled = self._precheck(self.initstate)
+            if not settled:
+                if solution:
+                    self._publish(link_solution(solution))  # Until a shorter one
+                solution, self.states_processed = self.pool.solve(
+                    self.initstate,
+                    self.solver_type,
+                    self.token,
+                    self.batch_eval,
+                    timeout=self.timeout,
+                    telemetry_interval=self.telemetry_interval,
+                    memory_breakdown=self.memory_breakdown,
+                    on_solution=lambda node: self._publish(link_solution(node)),
+                    profile=self.profile,
+                )
+                self.profile_report = self.pool.profile_report
+            self.stop_time = time.time_ns()
+            if solution:
+                print(f"{self.solver_type.upper()} solver found solution")
+                self._publish(link_solution(solution))
+        except Exception as e:
+            print(f"Solver pool error: {e}")
+            self.solution = None
+        finally:
+            self._finish()
+
     def run_solver(self):
-        """Start the solver in a separate process"""
+        """Start the solver in a separate process, or on the pool if given"""
         AsyncSolver._stop = False
         self.running = True
+        if self.pool is not None and self.pool.supports(self.solver_type):
+            self.token = self.pool.new_token()
+            if self.telemetry_interval is not None:
+                self.start_telemetry(
+                    self.pool.telemetry_channel(self.token), self.token
+                )
+            self.memory = memoryMonitor.MemoryMonitor(
+                [p.pid for p in self.pool.workers]
+            )
+            self.memory.start()
+            threading.Thread(target=self._run_pool_solve, daemon=True).start()
+            return
+
+        if self.telemetry_interval is not None:
+            self.telemetry_channel = multiprocessing.Queue()
+            self.start_telemetry(self.telemetry_channel, None)
+
         # Create a non-daemon process
         self.process = multiprocessing.Process(
             target=self._run_solver_process, args=(self.initstate, self.result_queue)
@@ -218,38 +356,132 @@ class AsyncSolver:
         # Poll for results in a separate thread
         threading.Thread(target=self._monitor_process, daemon=True).start()
         # Poll memmory usage
+        self.memory = memoryMonitor.MemoryMonitor([self.process.pid])
+        self.memory.start()
+
+    def start_telemetry(self, channel, tag):
         threading.Thread(
-            target=self.measure_memory_consumption,
-            daemon=True,
-            args=(self.process.pid,),
+            target=self._monitor_telemetry, args=(channel, tag), daemon=True
         ).start()
 
-    def measure_memory_consumption(self, pid: int):
-        while self.process.is_alive():
-            process = psutil.Process(pid)
-            mem = process.memory_info().rss
-            self.maxMemUsed = max(mem, self.maxMemUsed)
-            self.sumMemUsed += mem
-            self.measuresMemUsed += 1
-            time.sleep(1)
+    def _monitor_telemetry(self, channel, tag):
+        """Merge the samples of the solver processes, once per interval"""
+        latest = dict()  # pid -> last sample
+        stopped = False
+        while True:
+            done = self.future.done()
+            updated = False
+            deadline = time.time() + self.telemetry_interval
+            while True:
+                try:
+                    sample = channel.get(timeout=max(0, deadline - time.time()))
+                except queue.Empty:
+                    break
+                if sample["tag"] == tag:
+                    latest[sample["pid"]] = sample
+                    updated = True
+
+            if updated:
+                self.last_telemetry = telemetry.merge(list(latest.values()))
+                if self.on_telemetry is None:
+                    self.telemetry.put(self.last_telemetry)
+                elif self.on_telemetry(self.last_telemetry) and not (done or stopped):
+                    print("Solve stopped by its telemetry callback")
+                    self.stop()
+                    stopped = True
+            if done:
+                if self.pool is not None and tag is not None:
+                    self.pool.close_telemetry(tag)
+                return
 
     def _monitor_process(self):
         """Monitor the solver process and get result when ready"""
         try:
-            result = self.result_queue.get()
+            result = None
+            while result is None:
+                try:
+                    result = self.result_queue.get(timeout=0.1)
+                except queue.Empty:
+                    # Stopped or crashed before sending a result. Its last
+                    # put may still be in the pipe, so try once more.
+                    if not self.process.is_alive():
+                        result = self.result_queue.get(timeout=0.1)
+                message = pickle.loads(result) if result else None
+                if message and message[0] == "solution":
+                    # A better solution, published while the search goes on
+                    self._publish(link_solution(unpack_solution(message[1])))
+                    result = None
             if result:
                 unpacked_result = pickle.loads(result)
-                if isinstance(unpacked_result, tuple) and len(unpacked_result) == 4:
+                if isinstance(unpacked_result, tuple) and len(unpacked_result) == 6:
                     (
-                        self.solution,
+                        packed,
                         self.start_time,
                         self.stop_time,
                         self.states_processed,
+                        self.profile_report,
+                        self.verdict,
                     ) = unpacked_result
+                    if packed is not None:
+                        # Rebuild the solution and its next moves on this side
+                        self._publish(link_solution(unpack_solution(packed)))
         except:
-            self.solution = None
+            pass  # Keeps any solution published before
         finally:
-            self.running = False
+            self._finish()
+
+    def _publish(self, root: TreeNode):
+        """Make root the solution if it is shorter than the current one and
+        none of that one was played yet, then tell the solution callbacks.
+        """
+        moves = 0
+        v = root
+        while v.next is not None:
+            moves += 1
+            v = v.next[0]
+        with self.solution_lock:
+            if self.published is not None and (
+                self.solution is not self.published or moves >= self.published_moves
+            ):
+                return
+            self.solution = self.published = root
+            self.published_moves = moves
+        for fn in self.solution_callbacks:
+            fn(self)
+
+    def _finish(self):
+        """Mark the solve as over and wake up whoever is waiting on it"""
+        self.running = False
+        if self.memory is not None:
+            self.memory.stop()
+        self.future.set_result(self.solution)
+
+    def add_done_callback(self, fn):
+        """Call fn(solver) once the solve ends, from the thread ending it.
+
+        Called at once if it already ended.
+        """
+        self.future.add_done_callback(lambda _: fn(self))
+
+    def add_solution_callback(self, fn):
+        """Call fn(solver) each time a better solution is published, from the
+        thread publishing it.
+
+        Most solvers publish their only solution just before the solve ends,
+        the anytime solver each better one as soon as it finds it.
+        """
+        self.solution_callbacks.append(fn)
+
+    def wait(self, timeout=None) -> bool:
+        """Block until the solve ends or timeout seconds pass.
+
+        Returns True if it ended.
+        """
+        try:
+            self.future.result(timeout)
+        except FutureTimeoutError:  # Not the builtin before Python 3.11
+            pass
+        return self.future.done()
 
     def start(self):
         """Start the solver process"""
@@ -260,23 +492,24 @@ class AsyncSolver:
         return self.running
 
     def has_solution(self) -> bool:
-        return not self.is_running() and self.solution is not None
+        return self.solution is not None
 
     def get_solution(self) -> TreeNode:
-        if not self.is_running():
-            return self.solution
-        return None
+        """The solution published so far, if any (see add_solution_callback)"""
+        return self.solution
 
     def extract_solution(self) -> TreeNode:
-        """Return solution if found"""
-        if not self.is_running():
+        """Return solution if found, moving on to its next move.
+
+        Once a solution is being played, better ones are not published.
+        """
+        with self.solution_lock:
             solution = self.solution
             if solution is not None and solution.next is not None:
                 self.solution = solution.next[0]
             else:
                 self.solution = None
             return solution
-        return None
 
     def set_solver_type(self, solver_type):
         """Change solver type - must be called before start()"""
@@ -286,31 +519,196 @@ class AsyncSolver:
         return False
 
 
+MULTI_CORE_TIMEOUT = 60  # Seconds the multi-core solvers wait by default
+
+
+def run_search(
+    initstate: cb.CompactBoard,
+    solver_type: str,
+    batch_eval=False,
+    on_solution=None,
+    timeout=None,
+) -> tuple[TreeNode | None, int]:
+    """Run one of the AsyncSolver solver types in the current process.
+
+    Returns the solution node, if any, and the number of states processed
+    (0 for the solvers that do not count them). The anytime solver also
+    calls on_solution(node) with each better solution as it finds it. The
+    multi-core solvers give up on their workers after timeout seconds, or
+    MULTI_CORE_TIMEOUT; the others run until they finish or are stopped.
+    """
+    if timeout is None:
+        timeout = MULTI_CORE_TIMEOUT
+    solution = None
+    states_processed = 0
+    if deadlockDetector.start(initstate):
+        print("Deal can not be won")
+        return solution, states_processed
+
+    v = TreeNode(initstate)
+    if solver_type == "gready-multi-core" or solver_type == "a*-multi-core":
+        bfsSolver = importlib.import_module("greadyBfsSolver")
+        signal.signal(signal.SIGTERM, bfsSolver.kill_all)
+        solution = bfsSolver.bfs_distributed(
+            v, solver_type == "a*-multi-core", batch_eval, timeout=timeout
+        )
+    elif solver_type == "hda*-multi-core":
+        hdaStar = importlib.import_module("hdaStarSolver")
+        signal.signal(
+            signal.SIGTERM, importlib.import_module("greadyBfsSolver").kill_all
+        )
+        solution, states_processed = hdaStar.hda_star(v, timeout=timeout)
+    elif solver_type == "idastar" or solver_type == "idastar-in-place":
+        idastar = importlib.import_module("idaStarSolver")
+        ida = idastar.IDAStar(initstate, solver_type == "idastar-in-place", batch_eval)
+        solution = ida.runIDAS()
+    elif solver_type == "idastar-f":
+        idastar = importlib.import_module("idaStarSolver")
+        solution, states_processed = idastar.run_fcost_idastar(initstate)
+    elif solver_type == "anytime":
+        anytime = importlib.import_module("anytimeSolver")
+        solution, states_processed = anytime.run_anytime(initstate, on_solution)
+    elif solver_type == "gready-single-core" or solver_type == "a*-single-core":
+        bfsSolver = importlib.import_module("greadyBfsSolver")
+        solution, states_processed = bfsSolver.bfs_single_core(
+            v, solver_type == "a*-single-core", batch_eval
+        )
+    elif solver_type == "dfs" or solver_type == "dfs-in-place":
+        dfsSolver = importlib.import_module("dfsSolver")
+        solution = dfsSolver.run_dfs(initstate, solver_type == "dfs-in-place")
+    elif solver_type == "bfs":
+        bfsSolver = importlib.import_module("bfsSolver")
+        solution = bfsSolver.run_bfs(v)
+    return solution, states_processed
+
+
+def link_solution(solution: TreeNode) -> TreeNode:
+    """Set the next moves from the root down to a solution and return the root.
+
+    Also records the distance to the goal of every state on the way in
+    AsyncSolver.learn. Runs (see MoveType.run) are split into their moves,
+    so that the solution is played one card at a time.
+    """
+    v = solution
+    while v.parent is not None and v.move[0] != MoveType.run:
+        v = v.parent
+    if v.parent is not None:
+        while v.parent is not None:
+            v = v.parent
+        solution = replay_moves(TreeNode(v.state), solution_moves(solution))
+
+    depth = 0
+    v = solution
+    while v.parent is not None:
+        data = AsyncSolver.learn.get(v.state.key)
+        if data is None or depth < data:
+            AsyncSolver.learn[v.state.key] = depth
+        depth += 1
+        parent = v.parent
+        parent.next = (v, v.move)
+        v = parent
+    return v
+
+
+def solution_moves(solution: TreeNode) -> list[tuple[str, int, int]]:
+    """Moves from the root to a node, in playing order, runs split up."""
+    moves = []
+    v = solution
+    while v.parent is not None:
+        moves.extend(reversed(run_steps(v.move)))
+        v = v.parent
+    return moves[::-1]
+
+
 class MoveType:
     foundation = 0
     column = 1
+    # Safe moves to the foundations played as one step of the search:
+    # (run, source columns, foundations), one byte of each per card
+    run = 2
 
 
-def move_col_col(state: b.Board, from_col: int, to_col: int):
-    new_state = state.copy()
-    col1 = new_state.columns[from_col]
-    col2 = new_state.columns[to_col]
-    if new_state.is_valid_move_column_to_column(col1, col2):
-        col2.insert(col1.top())
-        col1.pop()
-        return new_state
-    return None
+def run_steps(move: tuple) -> list[tuple[str, int, int]]:
+    """The single moves of a move, several for a run"""
+    if move[0] != MoveType.run:
+        return [move]
+    return [(MoveType.foundation, col, found) for col, found in zip(move[1], move[2])]
 
 
-def move_col_foundation(state: b.Board, from_col: int, to_found: int):
-    new_state = state.copy()
-    col = new_state.columns[from_col]
-    found = new_state.foundations[to_found]
-    if new_state.is_valid_move_column_to_foundation(col, found):
-        found.insert(col.top())
-        col.pop()
-        return new_state
-    return None
+def move_col_col(state: cb.CompactBoard, from_col: int, to_col: int):
+    return state.move_col_col(from_col, to_col)
+
+
+def move_col_foundation(state: cb.CompactBoard, from_col: int, to_found: int):
+    return state.move_col_foundation(from_col, to_found)
+
+
+def move_run(state: cb.CompactBoard, from_cols: bytes, to_founds: bytes):
+    return state.move_run(from_cols, to_founds)
+
+
+def apply_move(state: cb.CompactBoard, move: tuple[str, int, int]) -> bool:
+    """Play a move in place on a mutable board (see CompactBoard.mutable_copy)."""
+    if move[0] == MoveType.foundation:
+        return state.apply_col_foundation(move[1], move[2])
+    if move[0] == MoveType.run:
+        steps = run_steps(move)
+        for played, step in enumerate(steps):
+            if not apply_move(state, step):
+                for step in reversed(steps[:played]):
+                    undo_move(state, step)
+                return False
+        return True
+    return state.apply_col_col(move[1], move[2])
+
+
+def undo_move(state: cb.CompactBoard, move: tuple[str, int, int]):
+    """Take back a move previously played with apply_move."""
+    if move[0] == MoveType.foundation:
+        state.undo_col_foundation(move[1], move[2])
+    elif move[0] == MoveType.run:
+        for step in reversed(run_steps(move)):
+            undo_move(state, step)
+    else:
+        state.undo_col_col(move[1], move[2])
+
+
+def replay_moves(root: TreeNode, moves: list[tuple[str, int, int]]) -> TreeNode:
+    """Build the TreeNode chain for a list of moves, returning the last node."""
+    move_card = {
+        MoveType.foundation: move_col_foundation,
+        MoveType.column: move_col_col,
+        MoveType.run: move_run,
+    }
+    node = root
+    for move in moves:
+        child = TreeNode(move_card[move[0]](node.state, move[1], move[2]), node)
+        node.add_child(child, move)
+        node = child
+    return node
+
+
+def pack_solution(solution: TreeNode) -> bytes:
+    """Compact form of a solution to send between processes.
+
+    Holds the root board and the moves from it, not the nodes themselves:
+
+        [1 if small mode][root data length][root data][MoveType, from, to ...]
+    """
+    root = solution
+    while root.parent is not None:
+        root = root.parent
+    data = root.state.data
+    moves = bytes(value for move in solution_moves(solution) for value in move)
+    return bytes([root.state.mode == "small", len(data)]) + data + moves
+
+
+def unpack_solution(packed: bytes) -> TreeNode:
+    """Replay a packed solution from its root, returning the solution node."""
+    end = 2 + packed[1]
+    root = cb.CompactBoard(bytes(packed[2:end]), "small" if packed[0] else "big")
+    moves = [tuple(packed[i : i + 3]) for i in range(end, len(packed), 3)]
+    return replay_moves(TreeNode(root), moves)
 
 
 def run_ai(game_board):
@@ -325,12 +723,12 @@ def run_ai(game_board):
         v = solution
         depth = 0
         while v.parent != None:
-            data = AsyncSolver.learn.get(hash(v.state))
+            data = AsyncSolver.learn.get(v.state.key)
             if data == None or depth < data:
-                AsyncSolver.learn[hash(v.state)] = depth
+                AsyncSolver.learn[v.state.key] = depth
             depth += 1
             parent = v.parent
-            parent.next = (v, parent.children[v])
+            parent.next = (v, v.move)
             v = parent
         return v
     else:
@@ -338,25 +736,124 @@ def run_ai(game_board):
         return None
 
 
-def get_possible_moves(board) -> list[tuple[str, int, int]]:
-    """Returns a prioritized list of possible moves in the given board state."""
+def safe_run(board: cb.CompactBoard, move: tuple[str, int, int]) -> tuple:
+    """move, a safe move to the foundations, or the run of it and the safe
+    moves it leads to.
+
+    A move to the foundations is safe when its card is of the lowest rank
+    missing from them: every card that could go on it is already there.
+    """
+    columns = [bytearray(column) for column in board.columns()]
+    founds = bytearray(board.foundation_tops())
+    from_cols, to_founds = bytearray(), bytearray()
+    while move is not None:
+        _, i, f = move
+        from_cols.append(i)
+        to_founds.append(f)
+        founds[f] = columns[i].pop()
+
+        move = None
+        lowest = min(top // 4 + 1 if top != cb.EMPTY else 0 for top in founds)
+        for i, column in enumerate(columns):
+            card = column[-1] if column else cb.EMPTY
+            if card // 4 != lowest:
+                continue
+            if card < 4:
+                move = (MoveType.foundation, i, founds.index(cb.EMPTY))
+                break
+            if card - 4 in founds:
+                move = (MoveType.foundation, i, founds.index(card - 4))
+                break
+
+    if len(from_cols) == 1:
+        return (MoveType.foundation, from_cols[0], to_founds[0])
+    return (MoveType.run, bytes(from_cols), bytes(to_founds))
+
+
+# Skip moves that only reorder independent moves (see get_possible_moves)
+PARTIAL_ORDER_REDUCTION = True
+
+
+def independent(move: tuple[str, int, int], other: tuple[str, int, int]) -> bool:
+    """Whether two moves touch different columns and foundations.
+
+    Such moves can be played in either order, and lead to the same board.
+    """
+    columns = (move[1], move[2]) if move[0] == MoveType.column else (move[1],)
+    if other[1] in columns:
+        return False
+    if other[0] == MoveType.column:
+        return other[2] not in columns
+    return move[0] == MoveType.column or move[2] != other[2]
+
+
+def get_possible_moves(
+    board: cb.CompactBoard, last_move=None
+) -> list[tuple[str, int, int]]:
+    """Returns a prioritized list of possible moves in the given board state.
+
+    A safe move to the foundations is the only move returned, as one run
+    with the safe moves that follow it (see safe_run).
+
+    Given the move that led to board, the moves independent of it that come
+    before it (as tuples) are left out: playing them first, then last_move,
+    reaches the same boards, so each set of independent moves is only tried
+    in one order.
+    """
+    founds = board.foundation_tops()
+    tops = board.tops()
+
+    # Index of where each card can go: the foundations waiting for it and,
+    # by rank, the columns whose top card it can be put on
+    empty_founds = []
+    found_for = dict()
+    minLen = 13
+    for f, top in enumerate(founds):
+        if top == cb.EMPTY:
+            empty_founds.append(f)
+            minLen = 0
+        else:
+            found_for[top + 4] = f
+            minLen = min(minLen, top // 4 + 1)
+
+    columns_by_rank = [[] for _ in range(14)]
+    for i, top in enumerate(tops):
+        if top != cb.EMPTY:
+            columns_by_rank[top // 4].append(i)
+
+    # Move Aces to the Foundation First**, and the safe moves that follow
+    for i in columns_by_rank[minLen]:
+        top = tops[i]
+        if top < 4:
+            return [safe_run(board, (MoveType.foundation, i, empty_founds[0]))]
+        if top in found_for:
+            return [safe_run(board, (MoveType.foundation, i, found_for[top]))]
+
     moves = []
-    minLen = min([len(found.cards) for found in board.foundations])
-    # Move Aces to the Foundation First**
-    for i, col in enumerate(board.columns):
-        if not col.is_empty() and col.top().cardValue.value == (minLen + 1):
-            for f, foundation in enumerate(board.foundations):
-                if board.is_valid_move_column_to_foundation(col, foundation):
-                    return [(MoveType.foundation, i, f)]
-
-    for i, col in enumerate(board.columns):
-        for f, foundation in enumerate(board.foundations):
-            if board.is_valid_move_column_to_foundation(col, foundation):
+    for i, top in enumerate(tops):
+        if top < 4:
+            for f in empty_founds:
                 moves.append((MoveType.foundation, i, f))
-
-    for i, col1 in enumerate(board.columns):
-        for f, col2 in enumerate(board.columns):
-            if i != f and board.is_valid_move_column_to_column(col1, col2):
-                moves.append((MoveType.column, i, f))
-
+        elif top in found_for:
+            moves.append((MoveType.foundation, i, found_for[top]))
+
+    for i, top in enumerate(tops):
+        if top != cb.EMPTY:
+            for f in columns_by_rank[top // 4 + 1]:
+                if i != f:
+                    moves.append((MoveType.column, i, f))
+
+    # A safe move to the foundations was the only move tried before board,
+    # so nothing was tried before it either
+    forced = last_move is not None and (
+        last_move[0] == MoveType.run
+        or last_move[0] == MoveType.foundation
+        and founds[last_move[2]] // 4 <= minLen
+    )
+    if last_move is not None and PARTIAL_ORDER_REDUCTION and not forced:
+        moves = [
+            move
+            for move in moves
+            if not (move < last_move and independent(move, last_move))
+        ]
     return moves
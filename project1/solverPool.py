@@ -0,0 +1,348 @@
+import math
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing import resource_tracker
+
+import compactBoard as cb
+import deadlockDetector
+import greadyBfsSolver
+import profiler
+import solver
+import telemetry
+from transpositionTable import SharedTranspositionTable, TranspositionTable
+
+# Solver types the pool can run. hda*-multi-core is left out since it starts
+# processes of its own, which daemon pool workers are not allowed to do.
+POOL_SOLVER_TYPES = (
+    "gready-multi-core",
+    "a*-multi-core",
+    "gready-single-core",
+    "a*-single-core",
+    "dfs",
+    "dfs-in-place",
+    "idastar",
+    "idastar-in-place",
+    "idastar-f",
+    "bfs",
+    "anytime",
+)
+
+
+def watch_token(token: int, current, finished: threading.Event):
+    """Raise the solver stop flag once the task's token is cancelled"""
+    while not finished.wait(0.01):
+        if current.value != token:
+            solver.AsyncSolver._stop = True
+            return
+
+
+def pool_worker(tasks, results, current, locks, telemetry_channel):
+    """Run search tasks until told to exit with None.
+
+    A task ends with ("done", token, states processed, packed solution or
+    None, profiler report or None). Solutions the solver publishes as it
+    goes (the anytime one) are sent before that as ("solution", token,
+    packed solution).
+    """
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+
+        kind, token, reporting, profile = task[:4]
+        if current.value != token:
+            results.put(("done", token, 0, None, None))  # Cancelled while queued
+            continue
+        if reporting is not None:  # Telemetry interval and memory breakdown
+            telemetry.start(telemetry_channel, token, *reporting)
+        if profile:
+            profiler.enable()
+
+        solver.AsyncSolver._stop = False
+        finished = threading.Event()
+        threading.Thread(
+            target=watch_token, args=(token, current, finished), daemon=True
+        ).start()
+
+        solution, states_processed = None, 0
+        try:
+            if kind == "solve":
+                _, _, _, _, root_state, solver_type, batch_eval = task
+
+                def on_solution(node):
+                    results.put(("solution", token, solver.pack_solution(node)))
+
+                solution, states_processed = solver.run_search(
+                    root_state, solver_type, batch_eval, on_solution
+                )
+            elif kind == "search":
+                _, _, _, _, start_nodes, a_star, batch_eval, table = task
+                # A reference to the shared table, or a table of the task's own
+                shared = isinstance(table, tuple)
+                visited = (
+                    SharedTranspositionTable.attach(table, locks) if shared else table
+                )
+                deadlockDetector.start(start_nodes[0].state)
+                found = []
+                _, states_processed = greadyBfsSolver.bfs_core(
+                    start_nodes,
+                    max_states=10**5,
+                    stop_check_fn=lambda: solver.AsyncSolver._stop,
+                    on_solution_fn=found.append,
+                    process_id=f"pool-{token}",
+                    a_star=a_star,
+                    batch_eval=batch_eval,
+                    visited=visited,
+                )
+                if shared:
+                    visited.close()
+                solution = found[0] if found else None
+        except Exception as e:
+            print(f"Solver pool task {token} failed: {e}")
+        finally:
+            finished.set()
+            telemetry.stop()
+            report = profiler.report() if profile else None
+            profiler.disable()
+
+        packed = solver.pack_solution(solution) if solution is not None else None
+        results.put(("done", token, states_processed, packed, report))
+
+
+class SolverPool:
+    """Long-lived solver processes shared by all the solves of a session.
+
+    Start it once per game or benchmark run and hand it to AsyncSolver, so a
+    new solve does not pay for process startup. Each solve runs under a
+    cancellation token: cancelling it, or taking a token for the next solve,
+    makes the workers drop the search at their next stop check. Only one
+    solve runs at a time.
+    """
+
+    def __init__(self, num_workers=None, tt_memory_mb=greadyBfsSolver.TT_MEMORY_MB):
+        if num_workers is None:
+            num_workers = max(1, (multiprocessing.cpu_count() - 1) // 2)
+        self.num_workers = num_workers
+        self.tt_memory_mb = tt_memory_mb
+        self.tasks = multiprocessing.Queue()
+        self.results = multiprocessing.Queue()
+        self.current = multiprocessing.Value("q", 0)  # Token of the running solve
+        self.locks = [multiprocessing.Lock() for _ in range(64)]  # Visited table
+        self.telemetry = multiprocessing.Queue()  # Samples of telemetry.Reporter
+        self.channels = dict()  # Token -> samples of its solve, see telemetry_channel
+        self.solve_lock = threading.Lock()
+        self.workers = []
+        # Summed profiler reports of the workers in the last solve run with
+        # profile, None otherwise
+        self.profile_report = None
+
+    def start(self):
+        # Workers must share the resource tracker of this process, otherwise
+        # each one reports the visited tables it opened as leaked on exit
+        resource_tracker.ensure_running()
+        for i in range(self.num_workers):
+            process = multiprocessing.Process(
+                target=pool_worker,
+                args=(
+                    self.tasks,
+                    self.results,
+                    self.current,
+                    self.locks,
+                    self.telemetry,
+                ),
+                name=f"SolverPool-{i}",
+            )
+            process.daemon = True
+            process.start()
+            self.workers.append(process)
+        threading.Thread(target=self._dispatch_telemetry, daemon=True).start()
+
+    def shutdown(self):
+        self.new_token()  # Cancel whatever is running
+        self.telemetry.put(None)
+        for _ in self.workers:
+            self.tasks.put(None)
+        for p in self.workers:
+            p.join(0.5)
+            if p.is_alive():
+                p.terminate()
+        self.workers = []
+
+    def _dispatch_telemetry(self):
+        """Hand the samples of the workers to the channel of their solve"""
+        while True:
+            sample = self.telemetry.get()
+            if sample is None:
+                return
+            channel = self.channels.get(sample["tag"])
+            if channel is not None:
+                channel.put(sample)
+
+    def telemetry_channel(self, token: int) -> queue.Queue:
+        """Queue of the telemetry samples of a solve, until close_telemetry.
+
+        Solves get their own channels, so one still being monitored can not
+        take the samples of the next.
+        """
+        return self.channels.setdefault(token, queue.Queue())
+
+    def close_telemetry(self, token: int):
+        self.channels.pop(token, None)
+
+    def supports(self, solver_type: str) -> bool:
+        return solver_type in POOL_SOLVER_TYPES
+
+    def new_token(self) -> int:
+        """Token for the next solve, which cancels the current one"""
+        with self.current.get_lock():
+            self.current.value += 1
+            return self.current.value
+
+    def cancel(self, token: int):
+        with self.current.get_lock():
+            if self.current.value == token:
+                self.current.value += 1
+
+    def cancelled(self, token: int) -> bool:
+        return self.current.value != token
+
+    def solve(
+        self,
+        root_state: cb.CompactBoard,
+        solver_type: str,
+        token: int,
+        batch_eval=False,
+        timeout=None,
+        telemetry_interval=None,
+        memory_breakdown=False,
+        on_solution=None,
+        profile=False,
+    ) -> tuple[solver.TreeNode | None, int]:
+        """Run a solve on the pool and wait for it.
+
+        Returns the solution node, if found before the token is cancelled
+        or timeout seconds pass (no limit if None), and the number of
+        states processed. With a telemetry_interval, the
+        workers send samples to the telemetry_channel of the token.
+        Solutions published while the solve goes on (see run_search) are
+        passed to on_solution(node) as they come. With profile, the workers
+        time the search phases, see profile_report.
+        """
+        self.profile_report = None
+        reporting = None
+        if telemetry_interval is not None:
+            reporting = (telemetry_interval, memory_breakdown)
+        with self.solve_lock:
+            if solver_type == "gready-multi-core" or solver_type == "a*-multi-core":
+                return self._solve_distributed(
+                    root_state,
+                    solver_type == "a*-multi-core",
+                    token,
+                    batch_eval,
+                    timeout,
+                    reporting,
+                    profile,
+                )
+
+            self.tasks.put(
+                (
+                    "solve",
+                    token,
+                    reporting,
+                    profile,
+                    root_state,
+                    solver_type,
+                    batch_eval,
+                )
+            )
+            return self._collect(token, 1, timeout, on_solution, profile)
+
+    def _solve_distributed(
+        self, root_state, a_star, token, batch_eval, timeout, reporting, profile
+    ):
+        """bfs_distributed on the pool workers, with a shared visited table.
+
+        If /dev/shm has no room for it, each task gets a copy of the states
+        seen so far instead.
+        """
+        if deadlockDetector.start(root_state):
+            return None, 0
+        try:
+            visited = SharedTranspositionTable(self.tt_memory_mb, locks=self.locks)
+        except MemoryError as e:
+            print(f"{e}, using a table per worker")
+            visited = TranspositionTable(self.tt_memory_mb / self.num_workers)
+        shared = isinstance(visited, SharedTranspositionTable)
+        try:
+            root = solver.TreeNode(root_state)
+            initial_nodes = greadyBfsSolver.expand_initial_nodes(
+                root, self.num_workers, a_star, batch_eval, visited
+            )
+            for node in initial_nodes:
+                if node.state.is_game_won():
+                    return node, 0
+
+            # Every worker searches from its share of the nodes at once, so
+            # no part of the frontier waits for another task to finish
+            shares = [
+                initial_nodes[i :: self.num_workers]
+                for i in range(min(self.num_workers, len(initial_nodes)))
+            ]
+            for share in shares:
+                self.tasks.put(
+                    (
+                        "search",
+                        token,
+                        reporting,
+                        profile,
+                        share,
+                        a_star,
+                        batch_eval,
+                        visited.reference() if shared else visited,
+                    )
+                )
+            return self._collect(token, len(shares), timeout, profile=profile)
+        finally:
+            if shared:
+                visited.close()
+                visited.unlink()
+
+    def _collect(self, token, num_tasks, timeout, on_solution=None, profile=False):
+        """Wait for the first task to end with a solution, or for all to end"""
+        deadline = math.inf if timeout is None else time.time() + timeout
+        done = 0
+        states_processed = 0
+        solution = None
+        reports = []
+        while done < num_tasks and time.time() < deadline:
+            if self.cancelled(token):
+                if not profile:
+                    break
+                # The other workers report once they stop, give them a moment
+                deadline = min(deadline, time.time() + 1)
+            try:
+                message = self.results.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            if message[1] != token:
+                continue  # Left over from a cancelled solve
+
+            if message[0] == "solution":
+                if on_solution is not None and not self.cancelled(token):
+                    on_solution(solver.unpack_solution(message[2]))
+                continue
+
+            states_processed += message[2]
+            done += 1
+            if message[4] is not None:
+                reports.append(message[4])
+            if message[3] is not None and solution is None:
+                solution = solver.unpack_solution(message[3])
+                self.cancel(token)  # Stop the other workers
+
+        self.cancel(token)
+        if reports:
+            self.profile_report = profiler.combine(reports)
+        return solution, states_processed
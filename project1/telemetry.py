@@ -0,0 +1,192 @@
+import importlib
+import threading
+import time
+
+import psutil
+
+import memoryMonitor
+
+INTERVAL = 0.5  # Seconds between samples
+
+
+class SearchStats:
+    """Counters of the search running in this process.
+
+    The searches update them as they go; a Reporter thread samples them.
+    """
+
+    __slots__ = (
+        "expanded",
+        "generated",
+        "duplicates",
+        "dead",
+        "open_size",
+        "best_h",
+        "depth",
+        "open",
+        "visited",
+    )
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.expanded = 0  # States whose children were generated
+        self.generated = 0  # Children generated
+        self.duplicates = 0  # Children dropped as already seen
+        self.dead = 0  # Children dropped as impossible to win (deadlockDetector)
+        self.open_size = 0  # States waiting to be expanded
+        self.best_h = None  # Lowest heuristic of an expanded state
+        self.depth = 0  # Depth of the last state expanded
+        # Open list and visited set, for the memory breakdown (see track)
+        self.open = None
+        self.visited = None
+
+
+stats = SearchStats()  # The search of this process
+
+# Settings of the reporter of this process (start's arguments), kept so that
+# forked search workers can report the same way (see start_child)
+_reporting = None
+_reporter = None
+
+
+def track(open_list, visited):
+    """Let the memory breakdown see the structures of a search.
+
+    Only kept while a reporter asked for the breakdown, so that nothing
+    outlives its search otherwise.
+    """
+    if _reporter is not None and _reporter.breakdown:
+        stats.open = open_list
+        stats.visited = visited
+
+
+class Reporter:
+    """Thread that puts a sample of stats in a queue every interval seconds.
+
+    With breakdown, samples also estimate the memory of the open list, the
+    visited set and the other search nodes still alive. Counting those walks
+    the whole heap, so it is only worth it for capacity planning.
+    """
+
+    def __init__(self, channel, tag, interval, breakdown=False):
+        self.channel = channel
+        self.tag = tag
+        self.interval = interval
+        self.breakdown = breakdown
+        self.process = psutil.Process()
+        self.finished = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def sample(self) -> dict:
+        try:
+            memory = memoryMonitor.process_memory(self.process)
+        except psutil.Error:
+            memory = 0
+        sample = {
+            "tag": self.tag,
+            "pid": self.process.pid,
+            "time": time.time(),
+            "expanded": stats.expanded,
+            "generated": stats.generated,
+            "duplicates": stats.duplicates,
+            "dead": stats.dead,
+            "open_size": stats.open_size,
+            "best_h": stats.best_h,
+            "depth": stats.depth,
+            "memory": memory,
+        }
+        if self.breakdown:
+            sample["breakdown"] = self.memory_breakdown()
+        return sample
+
+    def memory_breakdown(self) -> dict:
+        """Estimated bytes per search structure, see memoryMonitor"""
+        open_list, visited = stats.open, stats.visited
+        breakdown = {"open_list": 0, "visited": 0, "closed_nodes": 0, "shared": {}}
+        try:
+            breakdown["open_list"] = memoryMonitor.structure_bytes(open_list)
+            if hasattr(visited, "shm"):
+                # Counted once however many processes share it
+                breakdown["shared"][visited.shm.name] = visited.nbytes()
+            else:
+                breakdown["visited"] = memoryMonitor.structure_bytes(visited)
+
+            node_class = importlib.import_module("solver").TreeNode
+            nodes = memoryMonitor.count_instances(node_class)
+            if open_list and isinstance(open_list[0], node_class):
+                breakdown["closed_nodes"] = (
+                    nodes - len(open_list)
+                ) * memoryMonitor.object_bytes(open_list[0])
+        except (RuntimeError, IndexError, ValueError):
+            pass  # Changed or closed by the search while measured
+        return breakdown
+
+    def run(self):
+        while not self.finished.wait(self.interval):
+            self.channel.put(self.sample())
+
+    def stop(self):
+        self.finished.set()
+        self.thread.join()
+        self.channel.put(self.sample())  # Final counts
+
+
+def start(channel, tag=None, interval=INTERVAL, breakdown=False):
+    """Reset stats and report them to channel until stop() is called"""
+    global _reporting, _reporter
+    stop()
+    stats.reset()
+    _reporting = (channel, tag, interval, breakdown)
+    _reporter = Reporter(channel, tag, interval, breakdown)
+    _reporter.thread.start()
+
+
+def start_child():
+    """Report from a forked search worker if its parent was reporting.
+
+    Threads do not survive fork, so the worker needs a reporter of its own.
+    """
+    global _reporter
+    _reporter = None
+    if _reporting is not None:
+        start(*_reporting)
+
+
+def stop():
+    global _reporting, _reporter
+    if _reporter is not None:
+        _reporter.stop()
+    _reporting = None
+    _reporter = None
+    stats.open = stats.visited = None
+
+
+def merge(samples: list[dict]) -> dict:
+    """One sample for a search from the last samples of all its processes"""
+    best_h = [s["best_h"] for s in samples if s["best_h"] is not None]
+    merged = {
+        "time": max(s["time"] for s in samples),
+        "processes": len(samples),
+        "expanded": sum(s["expanded"] for s in samples),
+        "generated": sum(s["generated"] for s in samples),
+        "duplicates": sum(s["duplicates"] for s in samples),
+        "dead": sum(s["dead"] for s in samples),
+        "open_size": sum(s["open_size"] for s in samples),
+        "best_h": min(best_h) if best_h else None,
+        "depth": max(s["depth"] for s in samples),
+        "memory": sum(s["memory"] for s in samples),
+    }
+
+    breakdowns = [s["breakdown"] for s in samples if "breakdown" in s]
+    if breakdowns:
+        shared = dict()
+        for breakdown in breakdowns:
+            shared.update(breakdown["shared"])
+        merged["breakdown"] = {
+            "open_list": sum(b["open_list"] for b in breakdowns),
+            "visited": sum(b["visited"] for b in breakdowns) + sum(shared.values()),
+            "closed_nodes": sum(b["closed_nodes"] for b in breakdowns),
+        }
+    return merged
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules of the game sit next to each other in project1, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,138 @@
+import random
+
+import board as b
+import compactBoard as cb
+import deadlockDetector
+
+SUITS = "♣♠♥♦"  # In the order of cards.CardSuite
+RANKS = "A234"
+
+
+def small_board(columns, tops=(cb.EMPTY,) * 4) -> cb.CompactBoard:
+    """Small mode board from columns of cards like "3♦", bottom card first"""
+    cards = [
+        [RANKS.index(card[0]) * 4 + SUITS.index(card[1]) for card in column]
+        for column in columns
+    ]
+    lengths = [len(column) for column in cards]
+    data = bytes([len(cards), *tops, *lengths, *(c for col in cards for c in col)])
+    return cb.CompactBoard(data, "small")
+
+
+def children(state: cb.CompactBoard):
+    for from_col in range(state.n_columns()):
+        for found in range(4):
+            child = state.move_col_foundation(from_col, found)
+            if child is not None:
+                yield child
+        for to_col in range(state.n_columns()):
+            child = state.move_col_col(from_col, to_col)
+            if child is not None:
+                yield child
+
+
+def solvable(root: cb.CompactBoard, prune=False) -> bool:
+    """Exhaustive search, dropping the boards the detector calls dead if prune"""
+    seen = {root.data}
+    stack = [root]
+    while stack:
+        state = stack.pop()
+        if state.is_game_won():
+            return True
+        for child in children(state):
+            if child.data in seen:
+                continue
+            seen.add(child.data)
+            if prune and deadlockDetector.is_dead(child):
+                continue
+            stack.append(child)
+    return False
+
+
+def test_king_does_not_hold_the_cards_below_it():
+    # 2♥ is only stuck until 4♠ is played, then it can go on 3♣ or 3♠
+    root = small_board(
+        [
+            ["3♦", "2♥", "4♠"],
+            ["A♥", "4♦"],
+            ["4♣", "3♣"],
+            ["4♥", "A♠"],
+            ["A♦"],
+            ["2♦"],
+            ["2♠"],
+            ["3♠"],
+            ["A♣"],
+            ["2♣"],
+            ["3♥"],
+        ]
+    )
+    assert not deadlockDetector.start(root)
+    assert solvable(root, prune=True)
+
+
+def test_cards_moved_from_under_a_king():
+    root = small_board(
+        [
+            ["2♥", "4♠"],
+            ["A♥", "3♣"],
+            ["3♦"],
+            ["4♣"],
+            ["3♠", "2♠", "A♠"],
+            ["2♣", "A♣"],
+            ["4♦", "2♦", "A♦"],
+            ["4♥", "3♥"],
+        ]
+    )
+    assert not deadlockDetector.start(root)
+    state = root
+    for col in (4, 4, 4, 0):  # A♠ to 4♠
+        state = state.move_col_foundation(col, 1)
+    state = state.move_col_col(0, 1)  # 2♥ onto 3♣
+
+    assert not deadlockDetector.detector.relaxed_loss(state)
+    assert solvable(state, prune=True)
+
+
+def random_board(rng: random.Random) -> cb.CompactBoard:
+    """Small mode board with up to two cards of each suit on its foundation
+    and the rest shuffled into columns of 2 to 4.
+
+    Unlike the deals, Kings are not put at the bottom of their columns.
+    """
+    played = [rng.randint(0, 2) for suit in range(4)]
+    tops = [(n - 1) * 4 + suit if n else cb.EMPTY for suit, n in enumerate(played)]
+    cards = [card for card in range(16) if card // 4 >= played[card % 4]]
+    rng.shuffle(cards)
+    columns = []
+    while cards:
+        length = min(rng.randint(2, 4), len(cards))
+        columns.append(cards[:length])
+        cards = cards[length:]
+    lengths = [len(column) for column in columns]
+    data = bytes([len(columns), *tops, *lengths, *sum(columns, [])])
+    return cb.CompactBoard(data, "small")
+
+
+def test_dead_boards_can_not_be_won():
+    rng = random.Random(21)
+    roots = [random_board(rng) for _ in range(100)]
+    roots += [
+        cb.CompactBoard.from_board(b.deal_board(rng.randbytes(8), board_mode="small"))
+        for _ in range(20)
+    ]
+    for root in roots:
+        won = solvable(root)
+        if deadlockDetector.start(root):
+            assert not won
+            continue
+        assert solvable(root, prune=True) == won
+
+        # Boards along a random game from the root
+        state = root
+        for _ in range(10):
+            moves = list(children(state))
+            if not moves:
+                break
+            state = rng.choice(moves)
+            if deadlockDetector.is_dead(state):
+                assert not solvable(state)
@@ -0,0 +1,20 @@
+import random
+
+import solvability
+import solver
+from test_deadlockDetector import random_board, solvable
+
+
+def test_verdicts_match_exhaustive_search():
+    rng = random.Random(22)
+    for _ in range(100):
+        root = random_board(rng)
+        verdict, node = solvability.check(root)
+        if verdict == solvability.UNSOLVABLE:
+            assert not solvable(root)
+        elif verdict == solvability.SOLVABLE:
+            assert solvable(root)
+            won = solver.replay_moves(
+                solver.TreeNode(root), solver.solution_moves(node)
+            )
+            assert won.state.is_game_won()
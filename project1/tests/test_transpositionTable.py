@@ -0,0 +1,22 @@
+import pytest
+
+import transpositionTable
+from transpositionTable import SLOT_BYTES, SharedTranspositionTable
+
+
+def test_shared_table_fits_in_dev_shm(monkeypatch):
+    monkeypatch.setattr(transpositionTable, "free_shared_memory_mb", lambda: 64)
+    table = SharedTranspositionTable(512, stripes=4)
+    try:
+        assert table.stripe_slots * table.stripes * SLOT_BYTES <= 32 * 2**20
+        assert table.visit(12345, 3)
+        assert table.get(12345) == 3
+    finally:
+        table.close()
+        table.unlink()
+
+
+def test_shared_table_refuses_a_full_dev_shm(monkeypatch):
+    monkeypatch.setattr(transpositionTable, "free_shared_memory_mb", lambda: 10)
+    with pytest.raises(MemoryError):
+        SharedTranspositionTable(512, stripes=4)
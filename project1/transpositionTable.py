@@ -0,0 +1,206 @@
+import itertools
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+ENTRY_BYTES = 96  # Measured size of one dict entry with a 64-bit key
+
+
+class TranspositionTable:
+    """Best path cost (g) seen for each state key, with a memory cap.
+
+    When the table is full, the oldest entries (in insertion order) are
+    evicted in batches. An evicted state can be explored again if it is
+    reached later, which costs time but never loses a solution.
+    """
+
+    def __init__(self, max_memory_mb=512, evict_fraction=0.25):
+        self.capacity = max(1, int(max_memory_mb * 2**20) // ENTRY_BYTES)
+        self.evict_fraction = evict_fraction
+        self.table = dict()
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.table)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self.table
+
+    def get(self, key: int) -> int | None:
+        return self.table.get(key)
+
+    def visit(self, key: int, cost: int, reopen=False) -> bool:
+        """Record that a state was reached with the given cost.
+
+        Returns True if the state should be explored: it was never seen, or
+        reopen is set and it was only reached with a higher cost before.
+        """
+        best = self.table.get(key)
+        if best is not None and (not reopen or best <= cost):
+            return False
+
+        if best is None and len(self.table) >= self.capacity:
+            self.evict()
+        self.table[key] = cost
+        return True
+
+    def nbytes(self) -> int:
+        return len(self.table) * ENTRY_BYTES
+
+    def evict(self):
+        """Drop the oldest evict_fraction of the entries"""
+        count = max(1, int(len(self.table) * self.evict_fraction))
+        for key in list(itertools.islice(self.table, count)):
+            del self.table[key]
+        self.evictions += count
+
+    def clear(self):
+        self.table.clear()
+
+
+SLOT_BYTES = 12  # 64-bit key + 32-bit cost
+SHM_PATH = "/dev/shm"  # Where POSIX shared memory blocks live on Linux
+MIN_SHARED_MB = 8  # Smallest shared table worth sharing
+
+
+def free_shared_memory_mb() -> float | None:
+    """Free space for shared memory blocks, None if it has no size to check"""
+    try:
+        stats = os.statvfs(SHM_PATH)
+    except (OSError, AttributeError):  # No /dev/shm, or no statvfs on Windows
+        return None
+    return stats.f_bavail * stats.f_frsize / 2**20
+
+
+class SharedTranspositionTable:
+    """TranspositionTable that several processes can check and update at once.
+
+    Keys and costs are kept in a multiprocessing.shared_memory block as an
+    open addressing hash table. The table is split into stripes, each with its
+    own lock, so workers only contend when they touch the same stripe. Nothing
+    is evicted: once a stripe is 3/4 full, its new states are explored without
+    being recorded.
+
+    The block is only allocated as it is written, and writing past the free
+    space of /dev/shm kills the process with SIGBUS. So the table takes at
+    most half of the space free when it is made, and raises MemoryError if
+    that is less than MIN_SHARED_MB.
+    """
+
+    def __init__(self, max_memory_mb=512, stripes=64, locks=None):
+        free_mb = free_shared_memory_mb()
+        if free_mb is not None:
+            max_memory_mb = min(max_memory_mb, free_mb / 2)
+            if max_memory_mb < MIN_SHARED_MB:
+                raise MemoryError(
+                    f"Only {free_mb:.0f} MB free in {SHM_PATH}, too little for a "
+                    "shared visited table"
+                )
+
+        # Locks can only be handed to processes when they are started, so a
+        # process pool creates them once and reuses them for every table
+        if locks is None:
+            locks = [multiprocessing.Lock() for _ in range(stripes)]
+        self.locks = locks
+        self.stripes = len(locks)
+        self.stripe_slots = max(
+            4, int(max_memory_mb * 2**20) // SLOT_BYTES // self.stripes
+        )
+        self.max_load = self.stripe_slots * 3 // 4
+        slots = self.stripe_slots * self.stripes
+        # Shared memory starts zeroed, and key 0 marks an empty slot
+        self.shm = shared_memory.SharedMemory(
+            create=True, size=slots * SLOT_BYTES + self.stripes * 8
+        )
+        self._attach()
+
+    def reference(self) -> tuple[str, int]:
+        """Picklable handle on the table, to be opened again with attach"""
+        return self.shm.name, self.stripe_slots
+
+    @classmethod
+    def attach(cls, reference: tuple[str, int], locks) -> "SharedTranspositionTable":
+        """Open a table created by another process that shares its locks"""
+        table = cls.__new__(cls)
+        table.locks = locks
+        table.stripes = len(locks)
+        table.stripe_slots = reference[1]
+        table.max_load = table.stripe_slots * 3 // 4
+        table.shm = shared_memory.SharedMemory(reference[0])
+        table._attach()
+        return table
+
+    def _attach(self):
+        slots = self.stripe_slots * self.stripes
+        buf = self.shm.buf
+        self.keys = buf[: slots * 8].cast("Q")
+        self.counts = buf[slots * 8 : slots * 8 + self.stripes * 8].cast("q")
+        self.costs = buf[slots * 8 + self.stripes * 8 :].cast("i")
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for view in ("keys", "counts", "costs"):
+            del state[view]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._attach()
+
+    def _find(self, key: int) -> int:
+        """Slot holding key, or the empty slot where it would go.
+
+        Must be called with the lock of the key's stripe held.
+        """
+        keys = self.keys
+        base = (key % self.stripes) * self.stripe_slots
+        slot = (key // self.stripes) % self.stripe_slots
+        while keys[base + slot] not in (0, key):
+            slot = slot + 1 if slot + 1 < self.stripe_slots else 0
+        return base + slot
+
+    def __len__(self):
+        return sum(self.counts)
+
+    def __contains__(self, key: int) -> bool:
+        return self.get(key) is not None
+
+    def get(self, key: int) -> int | None:
+        key = key or 1
+        with self.locks[key % self.stripes]:
+            slot = self._find(key)
+            return self.costs[slot] if self.keys[slot] else None
+
+    def visit(self, key: int, cost: int, reopen=False) -> bool:
+        """Same as TranspositionTable.visit, atomic across processes."""
+        key = key or 1
+        stripe = key % self.stripes
+        with self.locks[stripe]:
+            slot = self._find(key)
+            if self.keys[slot]:
+                if not reopen or self.costs[slot] <= cost:
+                    return False
+            elif self.counts[stripe] < self.max_load:
+                self.keys[slot] = key
+                self.counts[stripe] += 1
+            else:
+                return True
+            self.costs[slot] = cost
+            return True
+
+    def nbytes(self) -> int:
+        """Size of the entries in use, shared by every process using it.
+
+        The block is allocated at full size, but only touched pages count
+        towards the memory of the processes.
+        """
+        return len(self) * SLOT_BYTES
+
+    def close(self):
+        """Detach this process from the table, the owner must also unlink it."""
+        for view in (self.keys, self.counts, self.costs):
+            view.release()
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()